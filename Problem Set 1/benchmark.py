@@ -0,0 +1,222 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from problem import HeuristicFunction, Problem
+from dungeon import DungeonProblem
+from parking import ParkingProblem
+from graph import GraphRoutingProblem, graphrouting_heuristic
+from dungeon_heuristic import weak_heuristic, strong_heuristic
+import argparse, glob, json, multiprocessing, os, time, tracemalloc
+
+# This script runs every search function against every heuristic on every level in "dungeons", "parks" and "graphs"
+# For each run, it records the wall time, the number of explored nodes (calls to "is_goal"),
+# the peak memory allocated during the search (using tracemalloc) and the solution cost.
+# The results can be saved to a JSON file and compared against a saved baseline to detect regressions.
+
+# The search functions to benchmark: name -> (function name in search.py, whether it requires a heuristic)
+SEARCH_FUNCTIONS: Dict[str, Tuple[str, bool]] = {
+    "bfs": ("BreadthFirstSearch", False),
+    "dfs": ("DepthFirstSearch", False),
+    "iddfs": ("IterativeDeepeningSearch", False),
+    "ucs": ("UniformCostSearch", False),
+    "astar": ("AStarSearch", True),
+    "gbfs": ("BestFirstSearch", True),
+    "beam": ("BeamSearch", True),
+    "beam_bfs": ("BreadthFirstBeamSearch", True),
+}
+
+def zero_heuristic(problem: Problem, state) -> float:
+    return 0
+
+# The level kinds: folder -> (file pattern, problem loader, available heuristics)
+LEVEL_KINDS: Dict[str, Tuple[str, Callable[[str], Problem], Dict[str, HeuristicFunction]]] = {
+    "dungeons": ("*.txt", DungeonProblem.from_file, {
+        "zero": zero_heuristic,
+        "weak": weak_heuristic,
+        "strong": strong_heuristic,
+    }),
+    "parks": ("*.txt", ParkingProblem.from_file, {
+        "zero": zero_heuristic,
+    }),
+    "graphs": ("*.json", GraphRoutingProblem.from_file, {
+        "zero": zero_heuristic,
+        "graphrouting": graphrouting_heuristic,
+    }),
+}
+
+# Returns all the (kind, level path, algorithm, heuristic) combinations to run
+def list_cases(root: str, kinds: List[str], algorithms: List[str]) -> List[Tuple[str, str, str, Optional[str]]]:
+    cases = []
+    for kind in kinds:
+        pattern, _, heuristics = LEVEL_KINDS[kind]
+        for level_path in sorted(glob.glob(os.path.join(root, kind, pattern))):
+            for algorithm in algorithms:
+                _, informed = SEARCH_FUNCTIONS[algorithm]
+                for heuristic in (heuristics if informed else [None]):
+                    cases.append((kind, level_path.replace(os.sep, '/'), algorithm, heuristic))
+    return cases
+
+# Returns a unique key for a benchmark case, which is used to match cases between the results and the baseline
+def case_key(case: Dict[str, Any]) -> str:
+    return f"{case['level']}:{case['algorithm']}:{case['heuristic'] or '-'}"
+
+# Runs a single case and returns (solution cost, solution length, explored nodes, elapsed time, peak memory)
+# Since tracemalloc slows down the allocations considerably, the time is measured only when the memory is not traced
+def run_case(kind: str, level_path: str, algorithm: str, heuristic_name: Optional[str], trace_memory: bool) -> Dict[str, Any]:
+    from helpers.utils import load_function, track_call_count
+    _, loader, heuristics = LEVEL_KINDS[kind]
+    function_name, informed = SEARCH_FUNCTIONS[algorithm]
+    search_fn = load_function(f"search.{function_name}")
+    problem = loader(level_path)
+    # We count the calls to "is_goal" on this problem instance only to get the number of explored nodes
+    is_goal = track_call_count(problem.is_goal)
+    is_goal.enable()
+    problem.is_goal = is_goal
+    initial_state = problem.get_initial_state()
+    args = (problem, initial_state, heuristics[heuristic_name]) if informed else (problem, initial_state)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        path = search_fn(*args)
+    finally:
+        elapsed = time.perf_counter() - start
+        memory = None
+        if trace_memory:
+            _, memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    cost = None
+    if path is not None:
+        cost = 0
+        state = initial_state
+        for action in path:
+            cost += problem.get_cost(state, action)
+            state = problem.get_successor(state, action)
+    return {
+        "cost": cost,
+        "length": None if path is None else len(path),
+        "nodes": is_goal.calls,
+        "time": None if trace_memory else elapsed,
+        "memory": memory,
+    }
+
+def _run_case_worker(queue: multiprocessing.Queue, *args):
+    try:
+        queue.put(("ok", run_case(*args)))
+    except Exception as err:
+        queue.put(("error", f"{type(err).__name__}: {err}"))
+
+# Runs a case in a separate process so that it can be stopped if it exceeds the timeout
+# It returns the status ("ok", "timeout" or "error") and the measurements (or the error message)
+def run_case_with_timeout(timeout: float, *args) -> Tuple[str, Any]:
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_case_worker, args=(queue, *args), daemon=True)
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return "timeout", None
+    if queue.empty():
+        return "error", None
+    return queue.get()
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    cases = list_cases(args.root, args.kinds, args.algorithms)
+    for index, (kind, level_path, algorithm, heuristic) in enumerate(cases):
+        result = {"kind": kind, "level": level_path, "algorithm": algorithm, "heuristic": heuristic}
+        print(f"{index+1}/{len(cases)}: {case_key(result)} ", end="", flush=True)
+        status, output = run_case_with_timeout(args.timeout, kind, level_path, algorithm, heuristic, False)
+        memory = None
+        if status == "ok" and not args.no_memory:
+            # The memory is measured in a second run since tracemalloc distorts the timing
+            memory_status, memory_output = run_case_with_timeout(args.timeout * args.memory_timeout_factor, kind, level_path, algorithm, heuristic, True)
+            memory = memory_output["memory"] if memory_status == "ok" else None
+        if status == "ok":
+            result.update(output)
+            result["memory"] = memory
+            result["status"] = "solved" if output["cost"] is not None else "unsolvable"
+            print(f"-> {result['status']} cost={result['cost']} nodes={result['nodes']} time={result['time']:.4f}s", end="")
+            print("" if memory is None else f" memory={memory/1024:.1f}KiB")
+        else:
+            result.update({"cost": None, "length": None, "nodes": None, "time": None, "memory": None, "status": status})
+            print(f"-> {status}" if output is None else f"-> {status}: {output}")
+        results.append(result)
+    return results
+
+# Compares the results against the baseline and returns a list of messages describing the regressions
+def compare_results(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], args: argparse.Namespace) -> List[str]:
+    baseline_map = {case_key(case): case for case in baseline}
+    regressions = []
+    def relative_increase(new, old):
+        return (new - old) / old if old else (0 if new == old else float('inf'))
+    for result in results:
+        key = case_key(result)
+        old = baseline_map.get(key)
+        if old is None: continue
+        if result["status"] != old["status"]:
+            # A run that used to time out (or fail) and now finishes is an improvement, any other change is a regression
+            if old["status"] in ("solved", "unsolvable"):
+                regressions.append(f"{key}: status changed from {old['status']} to {result['status']}")
+            continue
+        if result["status"] not in ("solved", "unsolvable"):
+            continue
+        if old["cost"] is not None and result["cost"] is not None and result["cost"] > old["cost"]:
+            regressions.append(f"{key}: cost increased from {old['cost']} to {result['cost']}")
+        if old["nodes"] is not None and relative_increase(result["nodes"], old["nodes"]) > args.nodes_tolerance:
+            regressions.append(f"{key}: explored nodes increased from {old['nodes']} to {result['nodes']}")
+        if old["time"] is not None and result["time"] is not None and result["time"] - old["time"] > args.min_time_difference \
+            and relative_increase(result["time"], old["time"]) > args.time_tolerance:
+            regressions.append(f"{key}: time increased from {old['time']:.4f}s to {result['time']:.4f}s")
+        if old["memory"] is not None and result["memory"] is not None \
+            and relative_increase(result["memory"], old["memory"]) > args.memory_tolerance:
+            regressions.append(f"{key}: peak memory increased from {old['memory']} to {result['memory']} bytes")
+    return regressions
+
+def main(args: argparse.Namespace):
+    if args.input:
+        with open(args.input, 'r') as f:
+            results = json.load(f)["results"]
+    else:
+        results = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_results(results, baseline, args)
+        if regressions:
+            print(f"Found {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            exit(1)
+        print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms on all the bundled levels")
+    parser.add_argument("--algorithms", "-a", nargs="+", default=list(SEARCH_FUNCTIONS.keys()),
+                        choices=list(SEARCH_FUNCTIONS.keys()), help="the search algorithms to benchmark")
+    parser.add_argument("--kinds", "-k", nargs="+", default=list(LEVEL_KINDS.keys()),
+                        choices=list(LEVEL_KINDS.keys()), help="the level folders to benchmark")
+    parser.add_argument("--root", "-r", default="",
+                        help="the directory containing the level folders (e.g. levels created by generators.py)")
+    parser.add_argument("--timeout", "-t", type=float, default=10, help="the time limit (seconds) for each run")
+    parser.add_argument("--memory-timeout-factor", type=float, default=4,
+                        help="multiply the time limit by this factor for the memory tracing run")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--output", "-o", default="", help="path to the JSON file where the results are saved")
+    parser.add_argument("--input", "-i", default="", help="load the results from a JSON file instead of running the benchmark")
+    parser.add_argument("--baseline", "-b", default="", help="path to a saved JSON result to compare against")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed relative increase in time")
+    parser.add_argument("--min-time-difference", type=float, default=0.01,
+                        help="time increases below this value (seconds) are considered noise")
+    parser.add_argument("--nodes-tolerance", type=float, default=0, help="allowed relative increase in explored nodes")
+    parser.add_argument("--memory-tolerance", type=float, default=0.1, help="allowed relative increase in peak memory")
+
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
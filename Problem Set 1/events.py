@@ -0,0 +1,119 @@
+from typing import Any, Callable, Deque, Iterable, Iterator, List, NamedTuple, Optional, TextIO
+from collections import deque
+from functools import partial
+
+# This file contains the expansion events emitted by the search functions and the sinks that consume them
+# Every search function in search.py accepts an optional "on_event" callback which is called with an "ExpansionEvent"
+# each time the search tests a state with "is_goal", so the events follow the same traversal order as the calls to "is_goal".
+# Unlike "record_calls" which stores the arguments of every call, the sinks below decide what to keep,
+# so tracing a large search can run in constant memory.
+
+class ExpansionEvent(NamedTuple):
+    state: Any                  # The state tested by the search
+    g: float                    # The path cost to the state (the number of actions for BFS, DFS and IDDFS)
+    h: Optional[float]          # The heuristic value of the state (None for the uninformed searches)
+    frontier_size: int          # The number of nodes in the frontier (the length of the current path for IDDFS)
+
+EventSink = Callable[[ExpansionEvent], None]
+
+_END = object() # A marker for the end of an iterator
+
+# Keeps the last "capacity" events only
+class RingBufferSink:
+    events: Deque[ExpansionEvent]
+    count: int                  # The total number of received events (including the dropped ones)
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.events = deque(maxlen=capacity)
+        self.count = 0
+
+    def __call__(self, event: ExpansionEvent):
+        self.events.append(event)
+        self.count += 1
+
+    def __iter__(self) -> Iterator[ExpansionEvent]:
+        return iter(self.events)
+
+# Forwards one event out of every "every" events to another sink (starting with the first event)
+class SamplingSink:
+    sink: EventSink
+    every: int
+    count: int                  # The total number of received events (including the skipped ones)
+
+    def __init__(self, sink: EventSink, every: int) -> None:
+        assert every >= 1, "the sampling interval must be at least 1"
+        self.sink = sink
+        self.every = every
+        self.count = 0
+
+    def __call__(self, event: ExpansionEvent):
+        if self.count % self.every == 0:
+            self.sink(event)
+        self.count += 1
+
+# Writes each event as a tab separated line to a file as soon as it is received
+# The state is written using "format_state" (str by default) so each problem can choose a compact representation
+class FileSink:
+    file: TextIO
+    format_state: Callable[[Any], str]
+    count: int
+
+    def __init__(self, path: str, format_state: Callable[[Any], str] = str) -> None:
+        self.file = open(path, 'w')
+        self.format_state = format_state
+        self.count = 0
+        self.file.write("index\tg\th\tfrontier\tstate\n")
+
+    def __call__(self, event: ExpansionEvent):
+        # The states may span many lines (e.g. a dungeon), so the line breaks are escaped
+        state = self.format_state(event.state).replace('\n', '\\n')
+        self.file.write(f"{self.count}\t{event.g}\t{'' if event.h is None else event.h}\t{event.frontier_size}\t{state}\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> "FileSink":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+# Sends every event to all the given sinks
+class TeeSink:
+    sinks: List[EventSink]
+
+    def __init__(self, *sinks: EventSink) -> None:
+        self.sinks = list(sinks)
+
+    def __call__(self, event: ExpansionEvent):
+        for sink in self.sinks:
+            sink(event)
+
+# Compares the traversal against an expected sequence while the search is running without storing it
+# "key" converts a state to the value compared with the expected sequence (e.g. the name of a graph node)
+class TraversalMatcher:
+    expected: Iterator[Any]
+    key: Callable[[Any], Any]
+    count: int                  # The number of received events
+    mismatch: Optional[int]     # The index of the first event that did not match (or None if all matched so far)
+
+    def __init__(self, expected: Iterable[Any], key: Callable[[Any], Any] = lambda state: state) -> None:
+        self.expected = iter(expected)
+        self.key = key
+        self.count = 0
+        self.mismatch = None
+
+    def __call__(self, event: ExpansionEvent):
+        if self.mismatch is None:
+            if next(self.expected, _END) != self.key(event.state):
+                self.mismatch = self.count
+        self.count += 1
+
+    # Returns whether the whole traversal matched the expected sequence (including its length)
+    def matched(self) -> bool:
+        return self.mismatch is None and next(self.expected, _END) is _END
+
+# Returns a search function that sends its expansion events to the given sink
+def with_events(search_fn: Callable, sink: EventSink) -> Callable:
+    return partial(search_fn, on_event=sink)
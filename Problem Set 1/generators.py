@@ -0,0 +1,201 @@
+from typing import Any, Dict, List, Set, Tuple
+from collections import deque
+from dungeon import DungeonTile
+from mathutils import Direction, Point, euclidean_distance
+from helpers.mt19937 import RandomGenerator
+import argparse, json, os
+
+# This file contains seeded generators for large instances of the search problems
+# The generators emit the same text/JSON formats read by "DungeonProblem.from_file",
+# "ParkingProblem.from_file" and "GraphRoutingProblem.from_file",
+# and they use our own random generator so the same seed always generates the same level.
+
+# Returns "count" distinct items from "items" using a partial Fisher-Yates shuffle
+def sample(rng: RandomGenerator, items: List[Any], count: int) -> List[Any]:
+    items = list(items)
+    assert count <= len(items), f"cannot sample {count} items from a list of {len(items)} items"
+    for index in range(count):
+        other = rng.int(index, len(items)-1)
+        items[index], items[other] = items[other], items[index]
+    return items[:count]
+
+# Returns the walkable cells that are connected to the given start cell
+def connected_cells(walkable: Set[Point], start: Point) -> Set[Point]:
+    visited = {start}
+    queue = deque([start])
+    while queue:
+        cell = queue.popleft()
+        for direction in Direction:
+            neighbor = cell + direction.to_vector()
+            if neighbor in walkable and neighbor not in visited:
+                visited.add(neighbor)
+                queue.append(neighbor)
+    return visited
+
+def grid_to_text(grid: List[List[str]]) -> str:
+    return '\n'.join(''.join(row) for row in grid) + '\n'
+
+# Generates a dungeon maze for the "DungeonProblem"
+# The maze is carved using a randomized depth first search, so every walkable cell is reachable from the player.
+# Then, "loops" is the probability of removing each remaining inner wall that separates two corridors,
+# which adds cycles to the maze (loops = 0 creates a perfect maze with a single path between any two cells).
+def generate_dungeon(width: int, height: int, coins: int, seed: int = 0, loops: float = 0.1) -> str:
+    # The maze has a cell at every odd coordinate and a perfect maze over these cells has (cells - 1) corridors,
+    # so at least (2 * cells - 1) cells are walkable and they must hold the player, the exit and the coins
+    cells = ((width - 1) // 2) * ((height - 1) // 2)
+    assert 2 * cells - 1 >= coins + 2, f"the dungeon is too small to hold the player, the exit and {coins} coins"
+    rng = RandomGenerator(seed)
+    grid = [[DungeonTile.WALL.value] * width for _ in range(height)]
+    # The maze cells have odd coordinates and the cells between them are either walls or corridors
+    start = Point(1, 1)
+    grid[start.y][start.x] = DungeonTile.EMPTY.value
+    stack = [start]
+    while stack:
+        cell = stack[-1]
+        neighbors = []
+        for direction in Direction:
+            step = direction.to_vector()
+            neighbor = Point(cell.x + 2 * step.x, cell.y + 2 * step.y)
+            if 0 < neighbor.x < width - 1 and 0 < neighbor.y < height - 1 and grid[neighbor.y][neighbor.x] == DungeonTile.WALL:
+                neighbors.append((neighbor, cell + step))
+        if not neighbors:
+            stack.pop()
+            continue
+        neighbor, between = neighbors[rng.int(0, len(neighbors)-1)]
+        grid[between.y][between.x] = DungeonTile.EMPTY.value
+        grid[neighbor.y][neighbor.x] = DungeonTile.EMPTY.value
+        stack.append(neighbor)
+    # Knock down some of the inner walls to create loops
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            if grid[y][x] != DungeonTile.WALL: continue
+            horizontal = grid[y][x-1] != DungeonTile.WALL and grid[y][x+1] != DungeonTile.WALL
+            vertical = grid[y-1][x] != DungeonTile.WALL and grid[y+1][x] != DungeonTile.WALL
+            if (horizontal or vertical) and rng.float() < loops:
+                grid[y][x] = DungeonTile.EMPTY.value
+    # Place the player, the exit and the coins on distinct walkable cells
+    walkable = [Point(x, y) for y in range(height) for x in range(width) if grid[y][x] != DungeonTile.WALL]
+    player, exit, *coin_cells = sample(rng, walkable, coins + 2)
+    grid[player.y][player.x] = DungeonTile.PLAYER.value
+    grid[exit.y][exit.x] = DungeonTile.EXIT.value
+    for coin in coin_cells:
+        grid[coin.y][coin.x] = DungeonTile.COIN.value
+    return grid_to_text(grid)
+
+# Generates a parking lot for the "ParkingProblem"
+# The parking file format supports up to 10 cars (A to J) and 10 slots (0 to 9).
+# "congestion" is the fraction of the inner floor that is turned into pillars.
+# The pillars are only added if the floor stays connected, so every car can reach every slot on an empty lot.
+def generate_parking(width: int, height: int, cars: int, seed: int = 0, congestion: float = 0.2) -> str:
+    assert 1 <= cars <= 10, "the parking file format supports between 1 and 10 cars"
+    assert (width - 2) * (height - 2) >= 2 * cars + 1, "the parking lot is too small for the requested number of cars"
+    rng = RandomGenerator(seed)
+    floor = {Point(x, y) for y in range(1, height - 1) for x in range(1, width - 1)}
+    # We keep at least one free cell in addition to the cells of the cars and the slots
+    pillars = min(int(congestion * len(floor)), len(floor) - 2 * cars - 1)
+    for cell in sample(rng, sorted(floor, key=lambda p: (p.y, p.x)), len(floor)):
+        if pillars <= 0: break
+        remaining = floor - {cell}
+        if len(connected_cells(remaining, next(iter(remaining)))) != len(remaining): continue
+        floor = remaining
+        pillars -= 1
+    cells = sample(rng, sorted(floor, key=lambda p: (p.y, p.x)), 2 * cars)
+    grid = [["#"] * width for _ in range(height)]
+    for cell in floor:
+        grid[cell.y][cell.x] = "."
+    for index in range(cars):
+        car, slot = cells[2 * index], cells[2 * index + 1]
+        grid[car.y][car.x] = "ABCDEFGHIJ"[index]
+        grid[slot.y][slot.x] = "0123456789"[index]
+    return grid_to_text(grid)
+
+# Generates a random geometric graph for the "GraphRoutingProblem"
+# The nodes are scattered uniformly in a square of the given size and every pair of nodes
+# closer than the given radius is connected in both directions.
+# If "connected" is true, every disconnected component is linked to its nearest node in the rest of the graph.
+# The start is a random node and the goal is the node that is furthest from it.
+def generate_graph(nodes: int, seed: int = 0, size: float = 100, radius: float = 15, connected: bool = True) -> Dict[str, Any]:
+    assert nodes >= 2, "the graph must contain at least 2 nodes"
+    rng = RandomGenerator(seed)
+    names = [f"n{index}" for index in range(nodes)]
+    positions = [Point(round(rng.float(0, size), 3), round(rng.float(0, size), 3)) for _ in range(nodes)]
+    adjacency: List[Set[int]] = [set() for _ in range(nodes)]
+    # Bucket the nodes in a grid of cells with a side equal to the radius, so we only compare nearby nodes
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    for index, position in enumerate(positions):
+        buckets.setdefault((int(position.x // radius), int(position.y // radius)), []).append(index)
+    for (bx, by), members in buckets.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for i in members:
+                    for j in buckets.get((bx + dx, by + dy), []):
+                        if i < j and euclidean_distance(positions[i], positions[j]) <= radius:
+                            adjacency[i].add(j)
+                            adjacency[j].add(i)
+    if connected:
+        # Find the components using a breadth first search then link each one to the closest node outside it
+        component = [-1] * nodes
+        components: List[List[int]] = []
+        for root in range(nodes):
+            if component[root] != -1: continue
+            members, queue = [root], deque([root])
+            component[root] = len(components)
+            while queue:
+                node = queue.popleft()
+                for neighbor in adjacency[node]:
+                    if component[neighbor] == -1:
+                        component[neighbor] = len(components)
+                        members.append(neighbor)
+                        queue.append(neighbor)
+            components.append(members)
+        linked = set(components[0])
+        for members in components[1:]:
+            _, i, j = min((euclidean_distance(positions[i], positions[j]), i, j) for i in members for j in linked)
+            adjacency[i].add(j)
+            adjacency[j].add(i)
+            linked.update(members)
+    start = rng.int(0, nodes - 1)
+    _, goal = max((euclidean_distance(positions[start], position), index) for index, position in enumerate(positions))
+    return {
+        "graph": {
+            names[index]: {
+                "position": [positions[index].x, positions[index].y],
+                "adjacent": [names[neighbor] for neighbor in sorted(adjacency[index])]
+            } for index in range(nodes)
+        },
+        "start": names[start],
+        "goal": names[goal],
+    }
+
+def main(args: argparse.Namespace):
+    directory = os.path.dirname(args.output)
+    if directory: os.makedirs(directory, exist_ok=True)
+    if args.kind == "dungeon":
+        content = generate_dungeon(args.width, args.height, args.coins, args.seed, args.loops)
+    elif args.kind == "parking":
+        content = generate_parking(args.width, args.height, args.cars, args.seed, args.congestion)
+    else:
+        content = json.dumps(generate_graph(args.nodes, args.seed, args.size, args.radius, not args.disconnected), indent=4)
+    with open(args.output, 'w') as f:
+        f.write(content)
+    print(f"Generated {args.kind} saved to {args.output}")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Generate large dungeons, parking lots and graphs")
+    parser.add_argument("kind", choices=["dungeon", "parking", "graph"], help="the kind of level to generate")
+    parser.add_argument("output", help="path to the file where the generated level is saved")
+    parser.add_argument("--seed", "-s", type=int, default=0, help="the seed of the random generator")
+    parser.add_argument("--width", "-W", type=int, default=21, help="the width of the dungeon or the parking lot")
+    parser.add_argument("--height", "-H", type=int, default=21, help="the height of the dungeon or the parking lot")
+    parser.add_argument("--coins", type=int, default=4, help="the number of coins in the dungeon")
+    parser.add_argument("--loops", type=float, default=0.1, help="the probability of removing an inner wall of the dungeon")
+    parser.add_argument("--cars", type=int, default=4, help="the number of cars in the parking lot (at most 10)")
+    parser.add_argument("--congestion", type=float, default=0.2, help="the fraction of the parking floor covered by pillars")
+    parser.add_argument("--nodes", type=int, default=100, help="the number of nodes in the graph")
+    parser.add_argument("--size", type=float, default=100, help="the side length of the square containing the graph nodes")
+    parser.add_argument("--radius", type=float, default=15, help="the maximum distance between two connected graph nodes")
+    parser.add_argument("--disconnected", action="store_true", help="do not link the disconnected components of the graph")
+
+    args = parser.parse_args()
+    main(args)
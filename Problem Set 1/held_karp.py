@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+from array import array
+from dungeon import DungeonProblem, DungeonState
+from mathutils import Direction, Point
+from problem import Solution
+
+# This file contains an exact solver specialised for the dungeon problem
+# The shortest walk that collects every coin then exits is a shortest walk through the coins in some order,
+# where every leg is a shortest path between two points of interest (the player, the coins and the exit).
+# So instead of searching over (player, coin set) states, we:
+# 1. Run a BFS from the player and from every coin to get the distances (and paths) between the points of interest.
+# 2. Run the Held-Karp dynamic program over the coin subsets to find the best coin order in O(2^n . n^2).
+# 3. Expand every leg of the best tour back into a list of directions.
+# Walking a leg may collect other coins on the way, which is harmless since the tour still visits every coin.
+
+UNREACHABLE = 0x7fffffff
+# The dynamic program stores 2^n . n entries and runs in O(2^n . n^2) in pure python,
+# so by default we refuse the dungeons with more coins than this instead of running for hours
+MAX_COINS = 16
+
+# Runs a BFS from the source over the walkable cells
+# It returns the direction used to first reach each cell and the distance from the source to each cell
+# The directions are tried in the same order as "DungeonProblem.get_actions" so the paths are deterministic
+def bfs_tree(problem: DungeonProblem, source: Point) -> Tuple[Dict[Point, Optional[Direction]], Dict[Point, int]]:
+    walkable = problem.layout.walkable
+    parents: Dict[Point, Optional[Direction]] = {source: None}
+    distances: Dict[Point, int] = {source: 0}
+    frontier = deque([source])
+    while frontier:
+        cell = frontier.popleft()
+        for direction in Direction:
+            neighbor = cell + direction.to_vector()
+            if neighbor in walkable and neighbor not in parents:
+                parents[neighbor] = direction
+                distances[neighbor] = distances[cell] + 1
+                frontier.append(neighbor)
+    return parents, distances
+
+# Returns the directions of the path from the BFS source to the target
+def path_to(parents: Dict[Point, Optional[Direction]], target: Point) -> List[Direction]:
+    path = []
+    while parents[target] is not None:
+        direction = parents[target]
+        path.append(direction)
+        target = target - direction.to_vector()
+    path.reverse()
+    return path
+
+# Returns the best coin order (as indices into "coins") and the tour length, or None if a coin or the exit is unreachable
+# "distances[i][j]" is the distance from point i to point j where point 0 is the player, the points 1..n are the coins and n+1 is the exit
+def held_karp(distances: List[List[int]], coin_count: int) -> Optional[Tuple[List[int], int]]:
+    n = coin_count
+    exit = n + 1
+    if n == 0:
+        cost = distances[0][exit]
+        return None if cost >= UNREACHABLE else ([], cost)
+    full = (1 << n) - 1
+    # cost[mask * n + j] is the length of the shortest walk from the player through the coins in "mask" ending at coin j
+    # and parent[mask * n + j] is the coin visited before j on that walk (or -1 if j is the first coin)
+    cost = array('i', [UNREACHABLE]) * ((1 << n) * n)
+    parent = array('b' if n < 128 else 'h', [-1]) * ((1 << n) * n)
+    for j in range(n):
+        cost[(1 << j) * n + j] = distances[0][j + 1]
+    for mask in range(1, full + 1):
+        base = mask * n
+        for j in range(n):
+            current = cost[base + j]
+            if current >= UNREACHABLE or not (mask >> j) & 1: continue
+            row = distances[j + 1]
+            for k in range(n):
+                if (mask >> k) & 1: continue
+                index = (mask | (1 << k)) * n + k
+                candidate = current + row[k + 1]
+                if candidate < cost[index]:
+                    cost[index] = candidate
+                    parent[index] = j
+    best, last = UNREACHABLE, -1
+    for j in range(n):
+        total = cost[full * n + j] + distances[j + 1][exit]
+        if total < best:
+            best, last = total, j
+    if best >= UNREACHABLE:
+        return None
+    order, mask = [], full
+    while last != -1:
+        order.append(last)
+        last, mask = parent[mask * n + last], mask & ~(1 << last)
+    order.reverse()
+    return order, best
+
+# Has the same signature as an uninformed search function so it can be given to an "UninformedSearchAgent"
+def HeldKarpSearch(problem: DungeonProblem, initial_state: DungeonState, max_coins: int = MAX_COINS) -> Solution:
+    coins = sorted(initial_state.remaining_coins, key=lambda coin: (coin.y, coin.x))
+    if len(coins) > max_coins:
+        raise ValueError(f"The Held-Karp solver supports at most {max_coins} coins but the dungeon has {len(coins)} coins")
+    points = [initial_state.player, *coins, problem.layout.exit]
+    # We only need a BFS from the player and the coins since nothing starts from the exit
+    trees = [bfs_tree(problem, source) for source in points[:-1]]
+    distances = [[tree_distances.get(target, UNREACHABLE) for target in points] for _, tree_distances in trees]
+    if any(distance >= UNREACHABLE for distance in distances[0]):
+        # If the player cannot reach a coin or the exit, there is no solution (otherwise all the points are connected)
+        return None
+    result = held_karp(distances, len(coins))
+    if result is None:
+        return None
+    order, _ = result
+    solution: List[Direction] = []
+    for source, target in zip([0] + [j + 1 for j in order], [j + 1 for j in order] + [len(points) - 1]):
+        solution.extend(path_to(trees[source][0], points[target]))
+    return solution
@@ -3,11 +3,14 @@ from agents import HeuristicFunction
 from graph import GraphRoutingProblem, graphrouting_heuristic
 from dungeon import DungeonProblem, Direction
 from problem import A, S, Problem
-from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function
+from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function, set_probes_enabled
 from .heuristic_checks import InconsistentHeuristicException, test_heuristic_consistency
 from functools import lru_cache
 import time
 
+# The explored nodes are read from the probes on "is_goal", so they are enabled for the tests
+set_probes_enabled(True, "GraphRoutingProblem.is_goal", "DungeonProblem.is_goal")
+
 def run_parking_trajectory(
     problem: Problem[S, A],
     path: List[A]) -> Tuple[Problem[S, A], List[A], S, float]:
@@ -115,6 +118,35 @@ def compare_search_results_for_dungeon(
     message = f"Level:{nl}{level}{nl}Expected:{nl}{expected}{nl}Got:{nl}- Path: {path_to_str(output[0])}{nl}- Explored {output[1]} nodes"
     return Result(False, 0, message)
 
+def run_solver_cost_for_dungeon(
+    function_path: str, 
+    problem: DungeonProblem) -> Tuple[Optional[int], str]:
+    solver_fn = load_function(function_path)
+    initial_state = problem.get_initial_state()
+    path = solver_fn(problem, initial_state)
+    if path is None:
+        return None, ""
+    path_cost = 0
+    state = initial_state
+    for action in path:
+        path_cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    message = "" if problem.is_goal(state) else "The solution does not reach the goal.\nFinal State:\n" + str(state)
+    return path_cost, message
+
+def compare_solver_cost_for_dungeon(
+    output: Tuple[Optional[int], str],
+    expected_path_cost: int,
+    level_path: str) -> Result:
+    path_cost, message = output
+    if message:
+        return Result(False, 0, message)
+    if path_cost != expected_path_cost:
+        nl = '\n'
+        level = open(level_path, 'r').read()
+        return Result(False, 0, f"Level:{nl}{level}{nl}Expected path cost to be {expected_path_cost} (the cost found by BFS and A*), got {path_cost}.")
+    return Result(True, 1, f"Path cost: {path_cost}")
+
 def test_dungeon_heuristic(
     function_path: str, 
     problem: DungeonProblem) -> Tuple[float, int, str, float]:
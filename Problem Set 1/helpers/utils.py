@@ -1,9 +1,12 @@
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 from dataclasses import dataclass
 from collections import deque
 import importlib, os, sys
 from importlib import util as ilu
-import traceback
+import traceback, time
+import fnmatch
+from types import MethodType
+from functools import update_wrapper
 
 solution_path = ""
 
@@ -41,42 +44,213 @@ class Arguments:
 def NotImplemented():
     raise NotImplementedError()
 
-def track_call_count(fn):
-    def deco(*args, **kwargs):
-        deco.calls += 1
-        return fn(*args, **kwargs)
-    deco.calls = 0
-    return deco
+# The instrumentation probes
+# A probe wraps a function to count its calls, record its arguments or notify a listener after each call.
+# When a probe decorates a method in a class body, it installs itself in the class as one of two plain functions:
+#   the original function (when disabled), so the probe costs nothing, or a wrapper that does the instrumentation (when enabled).
+# These probes are registered by their qualified name (e.g. "DungeonProblem.is_goal") so they can be switched at runtime.
+# The probes are disabled by default, so the decorated methods are the original functions and cost nothing.
+# The code that reads a probe (the test tools, the play scripts, the benchmark) enables it before running the search.
+# The counters are plain integers and the records are stored in a list which keeps every call (as before).
+# If a "capacity" is given, the records are stored in a preallocated ring buffer instead,
+# so a long run keeps the last "capacity" records only (the older ones are dropped) instead of growing without limit.
+
+_probes: Dict[str, "Probe"] = {}
+
+class Probe:
+    def __init__(self, fn: Callable, kind: str, capacity: Optional[int] = None, listener: Callable = None) -> None:
+        self.fn = fn
+        self.kind = kind            # "count", "record" or "listen"
+        self.name = getattr(fn, "__qualname__", repr(fn))
+        self.count = 0              # The number of calls since the last reset
+        self.capacity = capacity    # The maximum number of kept records (None keeps all of them)
+        self.records = ([] if capacity is None else [None] * capacity) if kind == "record" else None
+        self.listener = listener
+        self.enabled = False
+        self.owner = None           # The class where the probe is installed (None if it is used as a plain callable)
+        self.attribute = None
+        self.wrapper = self._make_wrapper()
+        for function in (fn, self.wrapper):
+            try:
+                function.probe = self
+            except AttributeError:  # Bound methods and builtins do not accept attributes
+                pass
+
+    def _make_wrapper(self) -> Callable:
+        fn, probe = self.fn, self
+        if self.kind == "count":
+            def wrapper(*args, **kwargs):
+                probe.count += 1
+                return fn(*args, **kwargs)
+        elif self.kind == "record" and self.capacity is None:
+            records = self.records
+            def wrapper(*args, **kwargs):
+                records.append((args, kwargs))
+                probe.count += 1
+                return fn(*args, **kwargs)
+        elif self.kind == "record":
+            records, capacity = self.records, self.capacity
+            def wrapper(*args, **kwargs):
+                index = probe.count
+                records[index % capacity] = (args, kwargs)
+                probe.count = index + 1
+                return fn(*args, **kwargs)
+        else:
+            listener = self.listener
+            def wrapper(*args, **kwargs):
+                returned = fn(*args, **kwargs)
+                listener(returned, *args, **kwargs)
+                return returned
+        return update_wrapper(wrapper, fn)
+
+    # Called when the probe decorates a method in a class body
+    def __set_name__(self, owner, name):
+        self.owner, self.attribute = owner, name
+        self.name = f"{owner.__qualname__}.{name}"
+        _probes[self.name] = self
+        self._install()
+
+    def _install(self):
+        if self.owner is not None:
+            setattr(self.owner, self.attribute, self.wrapper if self.enabled else self.fn)
+
+    def enable(self):
+        self.enabled = True
+        self._install()
+
+    def disable(self):
+        self.enabled = False
+        self._install()
+
+    # When the probe is used as a plain callable (e.g. it wraps a bound method or it is assigned to a class after its creation)
+    def __call__(self, *args, **kwargs):
+        return (self.wrapper if self.enabled else self.fn)(*args, **kwargs)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return MethodType(self, instance)
+
+    # Returns the recorded calls (oldest first) in the format {"args": ..., "kwargs": ...}
+    def recorded(self) -> deque:
+        if self.records is None:
+            return deque()
+        if self.capacity is None:
+            return deque({"args": args, "kwargs": kwargs} for args, kwargs in self.records)
+        start = max(0, self.count - self.capacity)
+        return deque({"args": args, "kwargs": kwargs} for args, kwargs in
+                     (self.records[index % self.capacity] for index in range(start, self.count)))
+
+    def reset(self):
+        self.count = 0
+        if self.records is not None:
+            # Drop the references to the recorded arguments so they can be garbage collected
+            self.records[:] = [] if self.capacity is None else [None] * self.capacity
+
+    # For compatibility with the function attribute used before: the call count or the recorded calls
+    @property
+    def calls(self):
+        return self.recorded() if self.kind == "record" else self.count
+
+    @calls.setter
+    def calls(self, value):
+        if self.kind == "record" or not value:
+            self.reset()
+        else:
+            self.count = value
+
+# Returns the probe attached to a function (or None if it has none)
+def get_probe_of(fn) -> "Probe":
+    if isinstance(fn, Probe):
+        return fn
+    return getattr(fn, "probe", None)
+
+# Returns the probe registered with the given name (e.g. "DungeonProblem.is_goal")
+def get_probe(name: str) -> "Probe":
+    return _probes[name]
+
+def list_probes() -> List[str]:
+    return sorted(_probes)
+
+# Enable or disable the registered probes whose names match any of the given patterns (e.g. "*.is_goal")
+def set_probes_enabled(enabled: bool, *patterns: str) -> List[str]:
+    names = [name for name in sorted(_probes) if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+    for name in names:
+        if enabled: _probes[name].enable()
+        else: _probes[name].disable()
+    return names
+
+def _probe_decorator(kind: str, fn, **options):
+    if fn is None:
+        return lambda fn: Probe(fn, kind, **options)
+    return Probe(fn, kind, **options)
+
+def track_call_count(fn=None):
+    return _probe_decorator("count", fn)
 
 def fetch_tracked_call_count(fn):
-    calls = getattr(fn, "calls", 0)
-    setattr(fn, "calls", 0)
+    probe = get_probe_of(fn)
+    if probe is None:
+        calls = getattr(fn, "calls", 0)
+        setattr(fn, "calls", 0)
+        return calls
+    calls = probe.count
+    probe.reset()
     return calls
 
-def record_calls(fn):
-    def deco(*args, **kwargs):
-        deco.calls.append({
-            "args": args,
-            "kwargs": kwargs
-        })
-        return fn(*args, **kwargs)
-    deco.calls = deque()
-    return deco
+def record_calls(fn=None, capacity: Optional[int] = None):
+    return _probe_decorator("record", fn, capacity=capacity)
 
 def fetch_recorded_calls(fn):
-    calls = getattr(fn, "calls", deque())
-    setattr(fn, "calls", deque())
+    probe = get_probe_of(fn)
+    if probe is None:
+        calls = getattr(fn, "calls", deque())
+        setattr(fn, "calls", deque())
+        return calls
+    calls = probe.recorded()
+    probe.reset()
     return calls
 
 def add_call_listener(listener):
     def decorator(fn):
-        def decorated(*args, **kwargs):
-            returned = fn(*args, **kwargs)
-            listener(returned, *args, **kwargs)
-            return returned
-        return decorated
+        return Probe(fn, "listen", listener=listener)
     return decorator
 
+# A cooperative deadline (or cancellation token) for the search loops
+# The searches call "tick" once per expansion, and the clock is only read once every "check_every" ticks, so the check is cheap.
+# Once the deadline expires (or "cancel" is called), "tick" keeps returning True and "timed_out" is set,
+# so the search can stop and return the best result found so far, and the caller can tell that it was interrupted.
+class Deadline:
+    def __init__(self, seconds: Optional[float] = None, check_every: int = 64) -> None:
+        self.expires_at = None if seconds is None else time.perf_counter() + seconds
+        self.check_every = max(1, check_every)
+        self.countdown = self.check_every
+        self.cancelled = False
+        self.timed_out = False
+
+    # Request the search to stop at its next check (e.g. from another thread)
+    def cancel(self):
+        self.cancelled = True
+
+    # Reads the clock now and returns whether the search should stop
+    def expired(self) -> bool:
+        if not self.timed_out and (self.cancelled or (self.expires_at is not None and time.perf_counter() >= self.expires_at)):
+            self.timed_out = True
+        return self.timed_out
+
+    # Called once per expansion, returns whether the search should stop
+    def tick(self) -> bool:
+        if self.timed_out: return True
+        self.countdown -= 1
+        if self.countdown > 0: return False
+        self.countdown = self.check_every
+        return self.expired()
+
+    # The remaining time in seconds (or None if the deadline has no time limit)
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None: return None
+        return max(0.0, self.expires_at - time.perf_counter())
+
 class CacheContainer:
     def cache(self) -> Dict[Any, Any]:
         if hasattr(self, "_cache"):
@@ -1,8 +1,10 @@
-from typing import List
-from dungeon import DungeonProblem, Direction, DungeonState, DungeonTile
+from typing import Dict, List
+from dungeon import DungeonProblem, Direction, DungeonLayout, DungeonState, DungeonTile
+from mathutils import Point
 from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
-from helpers.utils import fetch_tracked_call_count
+from helpers.utils import fetch_tracked_call_count, set_probes_enabled
 from helpers.heuristic_checks import test_heuristic_consistency
+from events import FileSink, SamplingSink, with_events
 from functools import lru_cache
 import argparse, time
 
@@ -15,6 +17,31 @@ def colored_dungeon(level: str):
     level = level.replace(DungeonTile.EXIT, f'{bcolors.BRIGHT_BLUE}{DungeonTile.EXIT}{bcolors.ENDC}')
     return level
 
+# The colors used by the incremental renderer (the same as colored_dungeon)
+def dungeon_colors():
+    from helpers.utils import bcolors
+    return {
+        DungeonTile.COIN.value: bcolors.BRIGHT_GREEN,
+        DungeonTile.PLAYER.value: bcolors.YELLOW,
+        DungeonTile.WALL.value: bcolors.BRIGHT_BLACK,
+        DungeonTile.EMPTY.value: bcolors.BRIGHT_BLACK,
+        DungeonTile.EXIT.value: bcolors.BRIGHT_BLUE,
+    }
+
+# Returns the rows of the parts of the map that never change (the walls, the floor and the exit)
+def dungeon_static_rows(layout: DungeonLayout) -> List[str]:
+    def static_tile(position: Point) -> str:
+        if position not in layout.walkable: return DungeonTile.WALL.value
+        if position == layout.exit: return DungeonTile.EXIT.value
+        return DungeonTile.EMPTY.value
+    return [''.join(static_tile(Point(x, y)) for x in range(layout.width)) for y in range(layout.height)]
+
+# Returns the cells that change across states (the coins and the player) drawn on top of the static rows
+def dungeon_dynamic_cells(state: DungeonState) -> Dict[tuple, str]:
+    cells = {(coin.x, coin.y): DungeonTile.COIN.value for coin in state.remaining_coins}
+    cells[(state.player.x, state.player.y)] = DungeonTile.PLAYER.value
+    return cells
+
 # Return the heuristic selected by the user
 def get_heuristic(name: str):
     if name == "zero":
@@ -54,6 +81,10 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "dfs":
         from search import DepthFirstSearch
         return UninformedSearchAgent(DepthFirstSearch)
+    if agent_type == "iddfs":
+        from search import IterativeDeepeningSearch
+        from functools import partial
+        return UninformedSearchAgent(partial(IterativeDeepeningSearch, transposition_size=args.transposition_size))
     if agent_type == "ucs":
         from search import UniformCostSearch
         return UninformedSearchAgent(UniformCostSearch)
@@ -73,6 +104,32 @@ def create_agent(args: argparse.Namespace):
         if args.checks:
             DungeonProblem.get_successor = test_heuristic_consistency(heuristic)(DungeonProblem.get_successor)
         return InformedSearchAgent(BestFirstSearch, heuristic)
+    if agent_type in ("beam", "beam_bfs"):
+        from search import BeamSearch, BreadthFirstBeamSearch, BeamStats
+        from functools import partial
+        search_fn = BeamSearch if agent_type == "beam" else BreadthFirstBeamSearch
+        # We cache the heuristic calls to speed up the search process if the heuristic is not fast
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
+        stats = BeamStats()
+        agent = InformedSearchAgent(partial(search_fn, beam_width=args.beam_width, stats=stats), heuristic)
+        # The statistics are kept by the agent since its search function may be wrapped later (e.g. by the solution cache)
+        agent.beam_stats = stats
+        return agent
+    if agent_type == "heldkarp":
+        from held_karp import HeldKarpSearch
+        return UninformedSearchAgent(HeldKarpSearch)
+    if agent_type == "portfolio":
+        from search import BreadthFirstSearch, AStarSearch, BestFirstSearch
+        from portfolio import PortfolioSearch, PortfolioEntry
+        # Since every action costs 1, BFS is optimal and both dungeon heuristics are admissible so A* is optimal too
+        weak, strong = lru_cache(2**16)(get_heuristic("weak")), lru_cache(2**16)(get_heuristic("strong"))
+        return UninformedSearchAgent(PortfolioSearch([
+            PortfolioEntry("bfs", BreadthFirstSearch, None, True),
+            PortfolioEntry("astar-weak", AStarSearch, weak, True),
+            PortfolioEntry("astar-strong", AStarSearch, strong, True),
+            PortfolioEntry("gbfs-weak", BestFirstSearch, weak, False),
+            PortfolioEntry("gbfs-strong", BestFirstSearch, strong, False),
+        ], args.portfolio_mode, args.portfolio_timeout or None))
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -80,20 +137,57 @@ def main(args: argparse.Namespace):
     state_printer = lambda state: print(state)
     if args.ansicolors: state_printer = lambda state: print(colored_dungeon(str(state)))
     start = time.time() # Track run time
+    set_probes_enabled(True, "DungeonProblem.is_goal") # The explored nodes are counted by the probe on "is_goal"
     problem = DungeonProblem.from_file(args.level) # create the problem
     state = problem.get_initial_state() # Get the initial state
-    print("Initial State:")
-    state_printer(state)
+    renderer = None
+    if args.diff and not args.headless:
+        # If desired by the user, only the cells that changed are redrawn at each step
+        from renderer import DiffRenderer
+        renderer = DiffRenderer(dungeon_static_rows(problem.layout), dungeon_colors() if args.ansicolors else None)
+        renderer.draw(dungeon_dynamic_cells(state), status="Initial State")
+    elif not args.headless:
+        print("Initial State:")
+        state_printer(state)
     agent = create_agent(args)
+    # The portfolio searches in worker processes, so we keep it to print its timings at the end
+    portfolio = getattr(agent, "search_fn", None) if args.agent == "portfolio" else None
+    trace = None
+    if args.trace and portfolio is None and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        # If desired by the user, we stream the expansion events (player position and remaining coins) to a file
+        trace = FileSink(args.trace, lambda state: f"{state.player} {sorted(state.remaining_coins, key=lambda coin: (coin.y, coin.x))}")
+        agent.search_fn = with_events(agent.search_fn, SamplingSink(trace, args.trace_every))
+    cache = None
+    if args.cache and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        # If desired by the user, we reuse the solution stored for this level, algorithm and heuristic instead of searching
+        from solution_cache import SolutionCache
+        cache = SolutionCache(args.cache)
+        if isinstance(agent, InformedSearchAgent):
+            agent.search_fn = cache.wrap(agent.search_fn, args.level, args.agent, agent.heuristic, args.heuristic)
+        else:
+            agent.search_fn = cache.wrap(agent.search_fn, args.level, args.agent)
     step = 0 # This will store the current step
     total_explored_nodes = 0 # This will store the number of traversed nodes during search
     unsolvable = False # This will store whether the problem is unsolvable or not
+    agent_time = 0 # This will store the time spent by the agent to choose its actions
     while not problem.is_goal(state):
         fetch_tracked_call_count(DungeonProblem.is_goal) # Clear the call counter
-        action = agent.act(problem, state) # Request an action from the agent
+        act_start = time.time()
+        refusal = None
+        try:
+            action = agent.act(problem, state) # Request an action from the agent
+        except ValueError as error:
+            # Some solvers refuse the levels they cannot solve in a reasonable time (e.g. "heldkarp" on a level with too many coins)
+            action, refusal = None, error
+        agent_time += time.time() - act_start
         # If no solution was found, break
         if action is None:
-            print("Agent cannot find a solution, exiting...")
+            if refusal is not None:
+                print(f"Agent cannot solve this level: {refusal}")
+            elif portfolio is not None and portfolio.timed_out:
+                print(f"The portfolio timed out after {portfolio.timeout} seconds before accepting a solution, exiting...")
+            else:
+                print("Agent cannot find a solution, exiting...")
             unsolvable = True
             break
         # Get the number of traversed nodes
@@ -102,9 +196,12 @@ def main(args: argparse.Namespace):
         state = problem.get_successor(state, action)
         step += 1
         # Print any useful information to the user
-        print("Step:", step)
-        print("Action:", str(action))
-        state_printer(state)
+        if renderer is not None:
+            renderer.draw(dungeon_dynamic_cells(state), status=f"Step: {step} / Action: {action}")
+        elif not args.headless:
+            print("Step:", step)
+            print("Action:", str(action))
+            state_printer(state)
     if not unsolvable: 
         # If desired by the user, we check that the heuristic is zero at the goal state
         if args.checks and isinstance(agent, InformedSearchAgent):
@@ -115,6 +212,20 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the number of traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Search explored {total_explored_nodes} nodes")
+    # If the beam search had to prune nodes, the solution may be suboptimal (or missing even if one exists)
+    beam_stats = getattr(agent, "beam_stats", None)
+    if beam_stats is not None and beam_stats.pruned:
+        print(f"Beam search pruned {beam_stats.pruned} nodes, so it may have missed a better solution")
+    if trace is not None:
+        trace.close()
+        print(f"Wrote {trace.count} expansion events to {args.trace}")
+    if portfolio is not None and portfolio.timings:
+        print(f"Portfolio timings (mode: {portfolio.mode}) for the last search:")
+        print(portfolio.report())
+    if cache is not None:
+        print(f"Solution cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    if args.headless or renderer is not None:
+        print(f"Agent time: {agent_time} seconds over {step} step(s)")
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -124,15 +235,33 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Dungeon as Human or AI")
     parser.add_argument("level", help="path to the dungeon to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'iddfs', 'ucs', 'astar', 'gbfs', 'beam', 'beam_bfs', 'heldkarp', 'portfolio'],
                         help="the agent that will play the game")
+    parser.add_argument("--transposition-size", "-ts", type=int, default=0,
+                        help="the number of states cached by the iterative deepening agent to skip transpositions (0 disables the cache)")
     parser.add_argument("--heuristic", '-hf', default="zero",
                         choices=["zero", "weak", "strong"],
                         help="choose the heuristic to use with A* or Greedy Best First Search")
+    parser.add_argument("--beam-width", "-bw", type=int, default=64,
+                        help="the maximum number of nodes kept by the beam search agents")
+    parser.add_argument("--portfolio-mode", "-pm", default="first", choices=["first", "optimal"],
+                        help="whether the portfolio agent accepts the first solution or the first proven-optimal solution")
+    parser.add_argument("--portfolio-timeout", "-pt", type=float, default=0,
+                        help="the time limit (seconds) of each portfolio search (0 means no limit)")
     parser.add_argument("--checks", "-c", action='store_true', default=False,
                         help="Enable consistency checks for the heuristic")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
                         help="Print the dungeon on the console with ANSI colors (only works on some terminals)")
+    parser.add_argument("--trace", default="",
+                        help="stream the expansion events of the search agent to this file")
+    parser.add_argument("--trace-every", type=int, default=1,
+                        help="only write one expansion event out of every N events to the trace file")
+    parser.add_argument("--diff", action="store_true",
+                        help="Draw the dungeon once then only redraw the cells that change (uses ANSI cursor moves)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Do not draw the dungeon at all and only report the timings")
+    parser.add_argument("--cache", nargs="?", const=".solution_cache", default="",
+                        help="Reuse the solutions stored in this cache file (default: .solution_cache) instead of searching again")
 
     args = parser.parse_args()
     try:
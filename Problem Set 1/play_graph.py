@@ -1,7 +1,7 @@
 import time
 from graph import GraphRoutingProblem, GraphNode, graphrouting_heuristic
 from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
-from helpers.utils import fetch_recorded_calls
+from events import FileSink, SamplingSink, with_events
 import argparse, os, json
 
 # Create an agent based on the user selections
@@ -32,6 +32,10 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "dfs":
         from search import DepthFirstSearch
         return UninformedSearchAgent(DepthFirstSearch)
+    if agent_type == "iddfs":
+        from search import IterativeDeepeningSearch
+        from functools import partial
+        return UninformedSearchAgent(partial(IterativeDeepeningSearch, transposition_size=args.transposition_size))
     if agent_type == "ucs":
         from search import UniformCostSearch
         return UninformedSearchAgent(UniformCostSearch)
@@ -61,15 +65,30 @@ def main(args: argparse.Namespace):
         print(figure)
     print("Current Node:", state)
     agent = create_agent(args)
+    traversed_nodes = [] # This will store all the traversed nodes in order of traversal
+    trace = None
+    if isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        # The traversal is retrieved from the expansion events of the search (instead of recording the calls to "is_goal")
+        # If desired by the user, the events are streamed to a file instead of being kept in memory
+        if args.trace:
+            trace = FileSink(args.trace, lambda node: node.name)
+            agent.search_fn = with_events(agent.search_fn, SamplingSink(trace, args.trace_every))
+        else:
+            agent.search_fn = with_events(agent.search_fn, lambda event: traversed_nodes.append(event.state.name))
+    cache = None
+    if args.cache and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        # If desired by the user, we reuse the solution stored for this graph and algorithm instead of searching
+        from solution_cache import SolutionCache
+        cache = SolutionCache(args.cache)
+        if isinstance(agent, InformedSearchAgent):
+            agent.search_fn = cache.wrap(agent.search_fn, graph_path, args.agent, agent.heuristic, "graphrouting")
+        else:
+            agent.search_fn = cache.wrap(agent.search_fn, graph_path, args.agent)
     step = 0 # This will store the current step
     path_cost = 0 # This will store the total path cost
-    traversed_nodes = [] # This will store all the traversed nodes in order of traversal
     unsolvable = False # This will store whether the problem is unsolvable or not
     while not problem.is_goal(state):
-        fetch_recorded_calls(GraphRoutingProblem.is_goal) # Clear the recorded calls
         action = agent.act(problem, state) # Request an action from the agent
-        # Retrieve the traversed nodes
-        traversed_nodes += [call["args"][1].name for call in list(fetch_recorded_calls(GraphRoutingProblem.is_goal))]
         # If no solution was found, break
         if action is None:
             print("Agent cannot find a solution, exiting...")
@@ -90,8 +109,13 @@ def main(args: argparse.Namespace):
     if not unsolvable: print("YOU WON!!")
     print("Path Cost:", path_cost)
     # This was a search agent, display the traversed nodes
-    if not isinstance(agent, HumanAgent):
+    if trace is not None:
+        trace.close()
+        print(f"Traversal of {trace.count} events written to {args.trace}")
+    elif not isinstance(agent, HumanAgent):
         print(f"Traversal Order: {'->'.join(traversed_nodes)}")
+    if cache is not None:
+        print(f"Solution cache: {cache.hits} hit(s), {cache.misses} miss(es)")
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -100,8 +124,16 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Graph as Human or AI")
     parser.add_argument("graph", help="path to the graph to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'iddfs', 'ucs', 'astar', 'gbfs'],
                         help="the agent that will play the game")
+    parser.add_argument("--transposition-size", "-ts", type=int, default=0,
+                        help="the number of states cached by the iterative deepening agent to skip transpositions (0 disables the cache)")
+    parser.add_argument("--trace", default="",
+                        help="stream the expansion events of the search to this file instead of printing the traversal order")
+    parser.add_argument("--trace-every", type=int, default=1,
+                        help="only write one expansion event out of every N events to the trace file")
+    parser.add_argument("--cache", nargs="?", const=".solution_cache", default="",
+                        help="Reuse the solutions stored in this cache file (default: .solution_cache) instead of searching again")
 
     args = parser.parse_args()
     try:
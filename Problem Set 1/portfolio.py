@@ -0,0 +1,135 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from problem import HeuristicFunction, Problem, S, A, Solution
+from solution_cache import encode_solution, decode_solution, configuration_of, describe
+from helpers.utils import fetch_tracked_call_count, get_probe_of
+import multiprocessing, queue, time
+
+# This file contains an algorithm portfolio which runs many search algorithms in parallel on the same problem
+# Each algorithm runs in its own worker process. As soon as a result is accepted, the remaining workers are cancelled.
+# There are two modes:
+# - "first": accept the first solution found by any algorithm.
+# - "optimal": accept the first solution found by an algorithm that is guaranteed to return an optimal solution
+#   (e.g. A* with a consistent heuristic), so the result is as good as the one found by the slowest optimal algorithm.
+# After each run, the time taken by every algorithm is stored in "timings" so the portfolio can be tuned.
+# If the timeout expires before a result is accepted, the portfolio returns None and sets "timed_out",
+# so the caller can tell it apart from a problem that has no solution.
+
+# An entry in the portfolio
+class PortfolioEntry(NamedTuple):
+    name: str                               # The name used in the timings
+    search_fn: Callable[..., Solution]      # The search function
+    heuristic: Optional[HeuristicFunction]  # The heuristic (or None if it is an uninformed search)
+    optimal: bool                           # Whether the returned solution is guaranteed to be optimal for this problem
+
+# The measurements of an algorithm in the last run
+class PortfolioTiming(NamedTuple):
+    status: str             # "solved", "unsolvable", "error" or "cancelled"
+    elapsed: float          # The time taken until the algorithm finished (or was cancelled)
+    explored: int           # The number of explored nodes (if the problem tracks the calls to "is_goal")
+
+def _run_entry(results: multiprocessing.Queue, entry: PortfolioEntry, problem: Problem[S, A], initial_state: S):
+    # The explored nodes are counted by the probe on "is_goal" (if the problem has one) to be reported in the timings
+    probe = get_probe_of(type(problem).is_goal)
+    if probe is not None: probe.enable()
+    fetch_tracked_call_count(type(problem).is_goal) # Clear the call counter inherited from the parent
+    start = time.perf_counter()
+    try:
+        if entry.heuristic is None:
+            solution = entry.search_fn(problem, initial_state)
+        else:
+            solution = entry.search_fn(problem, initial_state, entry.heuristic)
+        # The actions are sent as indices since some action types cannot be pickled
+        status, output = ("unsolvable", None) if solution is None else ("solved", encode_solution(problem, initial_state, solution))
+    except Exception as err:
+        status, output = "error", f"{type(err).__name__}: {err}"
+    elapsed = time.perf_counter() - start
+    results.put((entry.name, status, output, elapsed, fetch_tracked_call_count(type(problem).is_goal)))
+
+class PortfolioSearch:
+    entries: List[PortfolioEntry]
+    mode: str                               # "first" or "optimal"
+    timeout: Optional[float]                # The maximum time (seconds) to wait for a result (None means no limit)
+    timings: Dict[str, PortfolioTiming]     # The timings of the last run
+    winner: Optional[str]                   # The name of the algorithm whose result was accepted in the last run
+    timed_out: bool                         # Whether the last run ended because of the timeout (without an accepted result)
+
+    def __init__(self, entries: List[PortfolioEntry], mode: str = "first", timeout: Optional[float] = None) -> None:
+        assert mode in ("first", "optimal"), f"the portfolio mode must be 'first' or 'optimal', got {mode}"
+        assert mode == "first" or any(entry.optimal for entry in entries), "the 'optimal' mode needs at least one optimal algorithm"
+        self.entries = entries
+        self.mode = mode
+        self.timeout = timeout
+        self.timings = {}
+        self.winner = None
+        self.timed_out = False
+
+    # The portfolio has the same signature as an uninformed search function so it can be given to an "UninformedSearchAgent"
+    def __call__(self, problem: Problem[S, A], initial_state: S) -> Solution:
+        # We prefer "fork" since it does not require pickling the problem and the heuristics (which may be lambdas)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        results = context.Queue()
+        entries = {entry.name: entry for entry in self.entries}
+        workers = {
+            name: context.Process(target=_run_entry, args=(results, entry, problem, initial_state), daemon=True)
+            for name, entry in entries.items()
+        }
+        self.timings, self.winner, self.timed_out = {}, None, False
+        start = time.perf_counter()
+        for worker in workers.values():
+            worker.start()
+        accepted: Solution = None
+        try:
+            while len(self.timings) < len(workers):
+                remaining = None if self.timeout is None else self.timeout - (time.perf_counter() - start)
+                if remaining is not None and remaining <= 0:
+                    self.timed_out = True
+                    break
+                try:
+                    name, status, output, elapsed, explored = results.get(timeout=remaining)
+                except queue.Empty:
+                    self.timed_out = True
+                    break
+                self.timings[name] = PortfolioTiming(status, elapsed, explored)
+                entry = entries[name]
+                if status == "solved" and (self.mode == "first" or entry.optimal):
+                    self.winner, accepted = name, decode_solution(problem, initial_state, output)
+                    break
+                if status == "unsolvable" and entry.optimal:
+                    # An optimal algorithm is complete, so if it finds no solution then there is none
+                    self.winner = name
+                    break
+        finally:
+            # Cancel the workers that are still running
+            cancelled_at = time.perf_counter() - start
+            for name, worker in workers.items():
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+                if name not in self.timings:
+                    self.timings[name] = PortfolioTiming("cancelled", cancelled_at, 0)
+        # The nodes explored by the accepted algorithm are added to the call counter of "is_goal" (if it is tracked),
+        # so the caller sees the same count as if it had run that algorithm itself
+        probe = get_probe_of(type(problem).is_goal)
+        if self.winner is not None and probe is not None and probe.kind == "count":
+            probe.count += self.timings[self.winner].explored
+        return accepted
+
+    # Returns the functions and classes that define the portfolio and a description of its configuration (used by the solution cache)
+    def configuration(self) -> Tuple[List[Any], str]:
+        definitions: List[Any] = [type(self)]
+        described = []
+        for entry in self.entries:
+            entry_definitions, description = configuration_of(entry.search_fn)
+            definitions += entry_definitions
+            if entry.heuristic is not None: definitions += configuration_of(entry.heuristic)[0]
+            described.append(f"{entry.name}={description}")
+        return definitions, f"PortfolioSearch(mode={self.mode!r}, timeout={describe(self.timeout)}, entries=[{', '.join(described)}])"
+
+    # Returns a human readable report of the last run
+    def report(self) -> str:
+        lines = []
+        for name, (status, elapsed, explored) in sorted(self.timings.items(), key=lambda item: item[1].elapsed):
+            marker = " (accepted)" if name == self.winner else ""
+            lines.append(f"- {name}: {status} in {elapsed:.4f} seconds, explored {explored} nodes{marker}")
+        return '\n'.join(lines)
@@ -1,9 +1,13 @@
+from typing import Optional
 from problem import HeuristicFunction, Problem, S, A, Solution
 from collections import deque
 from helpers import utils
+from events import ExpansionEvent, EventSink
 
 from queue import PriorityQueue #COMMENT: For the UCS, A* and GBFS
 from dataclasses import dataclass #COMMENT: For defining the nodes data type(state, path, cost)
+import heapq #COMMENT: For the bounded frontier of the beam search
+from collections import OrderedDict #COMMENT: For the bounded transposition cache of the iterative deepening search
 
 
 # All search functions take a problem and a state
@@ -14,7 +18,13 @@ from dataclasses import dataclass #COMMENT: For defining the nodes data type(sta
 # 1. A list of actions which represent the path from the initial state to the final state
 # 2. None if there is no solution
 
-def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+# All the search functions also accept an optional "on_event" callback
+# which receives an "ExpansionEvent" (see events.py) every time the search tests a state with "is_goal"
+# and an optional "deadline" (see helpers/utils.py) which is checked once per expansion.
+# When the deadline expires, the search returns None (as if there was no solution) and "deadline.timed_out" is set,
+# so the caller can tell a search that ran out of time from a search that proved that there is no solution.
+
+def BreadthFirstSearch(problem: Problem[S, A], initial_state: S, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None) -> Solution:
     @dataclass()
     #COMMENT: Only need to keep track of the state and the path
     class Node:
@@ -26,10 +36,13 @@ def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
     frontier = deque()#COMMENT: Regular queue
     explored = set()
     initial_node = Node(initial_state, [])
+    if on_event is not None: on_event(ExpansionEvent(initial_state, 0, None, 0))
     if problem.is_goal(initial_state):
         return []
     frontier.append(initial_node)
     while frontier:
+        if deadline is not None and deadline.tick():#COMMENT: Out of time, there is no partial answer for an uninformed search
+            return None
         node = frontier.popleft()
         state, path = node.state, node.path
         explored.add(state)
@@ -38,12 +51,13 @@ def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
             successor_path = path + [action]
             successor_node = Node(successor, successor_path)
             if successor not in explored and successor_node not in frontier:
+                if on_event is not None: on_event(ExpansionEvent(successor, len(successor_path), None, len(frontier)))
                 if problem.is_goal(successor):#COMMENT: Check if the successor is the goal before dequeuing it
                     return successor_path
                 frontier.append(successor_node)
     return None
 
-def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+def DepthFirstSearch(problem: Problem[S, A], initial_state: S, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None) -> Solution:
     @dataclass()
     #COMMENT: Only need to keep track of the state and the path
     class Node:
@@ -57,12 +71,16 @@ def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
     initial_node = Node(initial_state, [])
     frontier.append(initial_node)
     while frontier:
+        if deadline is not None and deadline.tick():
+            return None
         node = frontier.pop()
         state, path = node.state, node.path
         
         #COMMENT: the first check to make it pass the test cases that was giving problems {the ones that was later modified} (and generaly any additional check is for the same resnon)
-        if state not in explored and problem.is_goal(state):#COMMENT: Check if the successor is the goal after popping it
-            return path
+        if state not in explored:
+            if on_event is not None: on_event(ExpansionEvent(state, len(path), None, len(frontier)))
+            if problem.is_goal(state):#COMMENT: Check if the successor is the goal after popping it
+                return path
         explored.add(state)
         for action in problem.get_actions(state):
             successor = problem.get_successor(state, action)
@@ -72,7 +90,60 @@ def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
                 frontier.append(successor_node)
     return None
 
-def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+def IterativeDeepeningSearch(problem: Problem[S, A], initial_state: S, transposition_size: int = 0, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None) -> Solution:
+    #COMMENT: Run a depth limited DFS with the limits 0, 1, 2, ... until a solution is found
+    #Unlike DepthFirstSearch, there is no explored set, the cycles are detected by checking the states on the current path only
+    #so the memory is O(depth) and the first solution found has the minimum number of actions (like BFS)
+    #If transposition_size > 0, a bounded cache (least recently used states are dropped) stores the shallowest depth where
+    #each state was reached in the current iteration, so a state reached again at the same depth or deeper is skipped
+    if on_event is not None: on_event(ExpansionEvent(initial_state, 0, None, 0))
+    if problem.is_goal(initial_state):
+        return []
+    end = object()#COMMENT: A marker for the end of the actions of a node
+    limit = 1
+    while True:
+        cutoff = False#COMMENT: Whether some node was not expanded because of the depth limit (otherwise deeper searches are useless)
+        transpositions = OrderedDict()
+        states, path = [initial_state], []#COMMENT: The states and the actions on the current path
+        on_path = {initial_state}
+        actions = [iter(problem.get_actions(initial_state))]#COMMENT: The remaining actions of every node on the current path
+        while actions:
+            if deadline is not None and deadline.tick():
+                return None
+            action = next(actions[-1], end)
+            if action is end:#COMMENT: All the actions of the current node were tried so we backtrack to its parent
+                actions.pop()
+                on_path.discard(states.pop())
+                if path: path.pop()
+                continue
+            successor = problem.get_successor(states[-1], action)
+            if successor in on_path:
+                continue
+            depth = len(states)
+            if transposition_size > 0:
+                seen = transpositions.get(successor)
+                if seen is not None and seen <= depth:
+                    transpositions.move_to_end(successor)
+                    continue
+                transpositions[successor] = depth
+                transpositions.move_to_end(successor)
+                if len(transpositions) > transposition_size:
+                    transpositions.popitem(last=False)
+            if on_event is not None: on_event(ExpansionEvent(successor, depth, None, depth))
+            if problem.is_goal(successor):#COMMENT: Check if the successor is the goal before expanding it (same as BFS)
+                return path + [action]
+            if depth == limit:
+                cutoff = True
+                continue
+            states.append(successor)
+            on_path.add(successor)
+            path.append(action)
+            actions.append(iter(problem.get_actions(successor)))
+        if not cutoff:
+            return None
+        limit += 1
+
+def UniformCostSearch(problem: Problem[S, A], initial_state: S, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None) -> Solution:
     #COMMENT: Now an aditional cost is needed to keep track of the path cost, order is also needed to keep
     #track of the order of the nodes in the frontier (To pass the given cases)
     @dataclass()
@@ -96,8 +167,11 @@ def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
     initial_node = Node(initial_state, [], 0)
     frontier.put(initial_node)
     while frontier.queue:
+        if deadline is not None and deadline.tick():
+            return None
         node = frontier.get()
         state, path, cost = node.state, node.path, node.cost
+        if on_event is not None: on_event(ExpansionEvent(state, cost, None, len(frontier.queue)))
         if problem.is_goal(state):#COMMENT: Check the node after getting it from the frontier
             return path
         explored.add(state)
@@ -117,7 +191,7 @@ def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
                     frontier.queue[index] = successor_node
     return None
 
-def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None) -> Solution:
     #COMMENT: Now cost has two typespath cost
     @dataclass()
     class Node:
@@ -125,6 +199,7 @@ def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFu
         path: list
         path_cost: int#COMMENT: Path cost
         cost: int#COMMENT: Path cost + heuristic cost (is the one used to order the nodes in the frontier)
+        heuristic: float#COMMENT: Heuristic cost (kept so the expansion events do not compute it again)
         order = 0
         def __gt__(self, other):
             if self.cost > other.cost:
@@ -137,12 +212,16 @@ def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFu
 
     frontier = PriorityQueue()#COMMENT: Priority queue based on the cost(path cost + heuristic cost)
     explored = set()
-    initial_node = Node(initial_state, [], 0, 0)
+    initial_heuristic = heuristic(problem, initial_state)
+    initial_node = Node(initial_state, [], 0, initial_heuristic, initial_heuristic)
     frontier.put(initial_node)
     order = 0
     while frontier.queue:
+        if deadline is not None and deadline.tick():#COMMENT: Out of time, the frontier nodes do not reach the goal so there is no answer
+            return None
         node = frontier.get()
         state, path, path_cost = node.state, node.path, node.path_cost
+        if on_event is not None: on_event(ExpansionEvent(state, path_cost, node.heuristic, len(frontier.queue)))
         if problem.is_goal(state):#COMMENT: Check the node after getting it from the frontier
             return path
         explored.add(state)
@@ -150,8 +229,9 @@ def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFu
             successor = problem.get_successor(state, action)
             successor_path = path + [action]
             successor_path_cost = path_cost + problem.get_cost(state, action)
-            successor_cost = heuristic(problem, successor) + successor_path_cost#COMMENT: Total cost
-            successor_node = Node(successor, successor_path, successor_path_cost, successor_cost)
+            successor_heuristic = heuristic(problem, successor)
+            successor_cost = successor_heuristic + successor_path_cost#COMMENT: Total cost
+            successor_node = Node(successor, successor_path, successor_path_cost, successor_cost, successor_heuristic)
             successor_node.order = order
             order += 1
             if successor_node not in frontier.queue and successor not in explored:
@@ -163,7 +243,7 @@ def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFu
                     frontier.queue[index] = successor_node
     return None
 
-def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None) -> Solution:
     #COMMENT: Now cost is only one type again but it is the heuristic cost
     @dataclass()
     class Node:
@@ -182,12 +262,15 @@ def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: Heurist
 
     frontier = PriorityQueue()#COMMENT: Priority queue based on the cost(heuristic cost)
     explored = set()
-    initial_node = Node(initial_state, [], 0)
+    initial_node = Node(initial_state, [], heuristic(problem, initial_state))
     order = 0
     frontier.put(initial_node)
     while frontier.queue:
+        if deadline is not None and deadline.tick():#COMMENT: Out of time, the frontier nodes do not reach the goal so there is no answer
+            return None
         node = frontier.get()
         state, path = node.state, node.path
+        if on_event is not None: on_event(ExpansionEvent(state, len(path), node.cost, len(frontier.queue)))
         if problem.is_goal(state):
             return path
         explored.add(state)
@@ -206,3 +289,112 @@ def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: Heurist
                 if successor_node < existing_node:#COMMENT: Replace the node if the new one has a lower cost
                     frontier.queue[index] = successor_node
     return None
+
+# The beam searches keep at most "beam_width" nodes in their frontier (or level),
+# but they may prune the only path to the goal (or the optimal one).
+# If a "stats" object is given, the number of pruned nodes is added to its "pruned" count,
+# so if it is not zero, a failure (or a suboptimal solution) may be caused by the pruning.
+
+# The statistics of the beam searches (they are added up over all the searches that receive the same object)
+@dataclass()
+class BeamStats:
+    pruned: int = 0 #COMMENT: The number of nodes dropped to keep the frontier within the beam width
+
+def BeamSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, beam_width: int = 64, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None, stats: Optional[BeamStats] = None) -> Solution:
+    #COMMENT: This is the best first search with a bounded frontier (the worst nodes are dropped when it exceeds the beam width)
+    #The expanded states are kept in an explored set (as in the best first search), so a state reached by another path is not expanded again
+    #Each node only points to its parent, so the path is rebuilt once the goal is found instead of being copied for every node
+    @dataclass(eq=False)
+    class Node:
+        state: S
+        parent: Optional["Node"]
+        action: Optional[A]
+        depth: int
+        cost: float #COMMENT: Heuristic cost
+        order: int
+        alive: bool = True #COMMENT: False once the node is expanded or dropped (its entries left in the heaps are skipped)
+
+    def build_path(node: Node) -> list:
+        path = []
+        while node.parent is not None:
+            path.append(node.action)
+            node = node.parent
+        path.reverse()
+        return path
+
+    #COMMENT: The frontier is stored in two heaps, one pops the best node to expand it and the other pops the worst node to drop it
+    initial_node = Node(initial_state, None, None, 0, heuristic(problem, initial_state), 0)
+    best, worst = [(initial_node.cost, 0, initial_node)], [(-initial_node.cost, 0, initial_node)]
+    in_frontier = {initial_state}
+    explored = set()
+    if stats is None: stats = BeamStats()
+    order = 1
+    while in_frontier:
+        if deadline is not None and deadline.tick():#COMMENT: Out of time, the frontier nodes do not reach the goal so there is no answer
+            return None
+        node = heapq.heappop(best)[2]
+        while not node.alive:
+            node = heapq.heappop(best)[2]
+        node.alive = False
+        in_frontier.discard(node.state)
+        if on_event is not None: on_event(ExpansionEvent(node.state, node.depth, node.cost, len(in_frontier)))
+        if problem.is_goal(node.state):
+            return build_path(node)
+        explored.add(node.state)
+        for action in problem.get_actions(node.state):
+            successor = problem.get_successor(node.state, action)
+            if successor in explored or successor in in_frontier:
+                continue
+            successor_node = Node(successor, node, action, node.depth + 1, heuristic(problem, successor), order)
+            heapq.heappush(best, (successor_node.cost, order, successor_node))
+            heapq.heappush(worst, (-successor_node.cost, -order, successor_node))
+            order += 1
+            in_frontier.add(successor)
+            if len(in_frontier) > beam_width:#COMMENT: Drop the worst node to keep the frontier within the beam width
+                dropped = heapq.heappop(worst)[2]
+                while not dropped.alive:
+                    dropped = heapq.heappop(worst)[2]
+                dropped.alive = False
+                in_frontier.discard(dropped.state)
+                stats.pruned += 1
+        #COMMENT: Remove the skipped entries once they outnumber the frontier nodes, so the heaps stay proportional to the beam width
+        if len(best) + len(worst) > 4 * (len(in_frontier) + 1):
+            best = [entry for entry in best if entry[2].alive]
+            worst = [entry for entry in worst if entry[2].alive]
+            heapq.heapify(best)
+            heapq.heapify(worst)
+    return None
+
+def BreadthFirstBeamSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, beam_width: int = 64, on_event: Optional[EventSink] = None, deadline: Optional[utils.Deadline] = None, stats: Optional[BeamStats] = None) -> Solution:
+    #COMMENT: This is the classic beam search, it expands the search tree level by level (like BFS)
+    #but only the best "beam_width" nodes of each level (according to the heuristic) are kept for the next level
+    #Only the kept states are marked as visited, so the visited set is also bounded by (beam_width x depth)
+    if on_event is not None: on_event(ExpansionEvent(initial_state, 0, heuristic(problem, initial_state), 0))
+    if problem.is_goal(initial_state):
+        return []
+    if stats is None: stats = BeamStats()
+    level = [(initial_state, [])]
+    visited = {initial_state}
+    order = 0
+    while level:
+        if deadline is not None and deadline.tick():#COMMENT: Out of time, the level nodes do not reach the goal so there is no answer
+            return None
+        candidates = {}#COMMENT: state -> (heuristic, order, path) for the successors of the current level
+        for state, path in level:
+            for action in problem.get_actions(state):
+                successor = problem.get_successor(state, action)
+                if successor in visited or successor in candidates:
+                    continue
+                successor_path = path + [action]
+                successor_heuristic = heuristic(problem, successor)
+                if on_event is not None: on_event(ExpansionEvent(successor, len(successor_path), successor_heuristic, len(candidates)))
+                if problem.is_goal(successor):#COMMENT: Check if the successor is the goal when it is generated (same as BFS)
+                    return successor_path
+                candidates[successor] = (successor_heuristic, order, successor_path)
+                order += 1
+        #COMMENT: Keep the best candidates and break the ties by their generation order
+        ranked = sorted(candidates.items(), key=lambda item: item[1][:2])
+        stats.pruned += max(0, len(ranked) - beam_width)
+        level = [(state, path) for state, (_, _, path) in ranked[:beam_width]]
+        visited.update(state for state, _ in level)
+    return None
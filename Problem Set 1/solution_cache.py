@@ -0,0 +1,137 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from functools import partial
+from problem import Problem, S, A, Solution
+import hashlib, inspect, os, pickle, zlib
+
+# This file contains a persistent on-disk cache for the solutions found by the search agents
+# An entry is keyed by a content hash of the level file, the search algorithm name, the heuristic name
+# and the configuration of the search function (the arguments bound with "functools.partial", e.g. the beam width).
+# Each entry also stores a fingerprint of the solver code (the files defining the search function,
+# the heuristic and the problem) and of the state from which the search started.
+# If the level changes, its key changes, and if the code changes, the fingerprint no longer matches,
+# so stale solutions are never returned.
+# The solution is stored compactly as the index of each action within "problem.get_actions(state)",
+# so the actions are decoded by replaying them from the start state, which works for any problem and action type.
+
+CacheKey = Tuple[str, str, str, str]
+
+# Returns the hex digest of the SHA-256 hash of the given byte strings
+def digest(parts: Iterable[bytes]) -> str:
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(hashlib.sha256(part).digest())
+    return hasher.hexdigest()
+
+# Returns the content of the source file that defines the given function or class (or nothing if it has none)
+def source_of(obj: Any) -> bytes:
+    try:
+        path = inspect.getsourcefile(inspect.unwrap(obj))
+    except TypeError:
+        return b""
+    if path is None or not os.path.isfile(path):
+        return b""
+    with open(path, 'rb') as f:
+        return f.read()
+
+# Returns a description of an argument bound to a search function
+# Only the plain values are written out, the other objects (e.g. the statistics or the event sinks) are described by their type
+# since their content does not change the search result.
+def describe(value: Any) -> str:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(describe(item) for item in value) + ']'
+    return configuration_of(value)[1]
+
+# Returns the functions and classes whose code defines the behaviour of the given search function and a description of its configuration
+# The "functools.partial" objects are unpacked into their function and their bound arguments,
+# the callable objects can describe themselves with a "configuration" method (e.g. "PortfolioSearch"),
+# and the other callable objects are defined by their class.
+def configuration_of(search_fn: Any) -> Tuple[List[Any], str]:
+    search_fn = inspect.unwrap(search_fn)
+    if isinstance(search_fn, partial):
+        definitions, description = configuration_of(search_fn.func)
+        for value in (*search_fn.args, *search_fn.keywords.values()):
+            if callable(value): definitions = definitions + configuration_of(value)[0]
+        arguments = [describe(value) for value in search_fn.args]
+        arguments += [f"{name}={describe(value)}" for name, value in sorted(search_fn.keywords.items())]
+        return definitions, f"{description}({', '.join(arguments)})"
+    if inspect.isroutine(search_fn) or inspect.isclass(search_fn):
+        return [search_fn], getattr(search_fn, "__qualname__", type(search_fn).__qualname__)
+    configuration = getattr(search_fn, "configuration", None)
+    if configuration is not None:
+        return configuration()
+    return [type(search_fn)], type(search_fn).__qualname__
+
+# Convert a solution to a tuple of action indices by replaying it from the given state
+def encode_solution(problem: Problem[S, A], state: S, solution: Solution) -> Optional[Tuple[int, ...]]:
+    if solution is None: return None
+    indices = []
+    for action in solution:
+        indices.append(list(problem.get_actions(state)).index(action))
+        state = problem.get_successor(state, action)
+    return tuple(indices)
+
+# Convert a tuple of action indices back to a solution by replaying it from the given state
+def decode_solution(problem: Problem[S, A], state: S, indices: Optional[Tuple[int, ...]]) -> Solution:
+    if indices is None: return None
+    solution = []
+    for index in indices:
+        action = list(problem.get_actions(state))[index]
+        solution.append(action)
+        state = problem.get_successor(state, action)
+    return solution
+
+class SolutionCache:
+    path: str                                          # The file where the cache is stored
+    max_entries: int                                   # The maximum number of stored entries (the oldest are dropped first)
+    entries: Dict[CacheKey, Tuple[str, str, Optional[Tuple[int, ...]]]] # key -> (code fingerprint, state fingerprint, encoded solution)
+    hits: int                                          # The number of searches that were skipped
+    misses: int                                        # The number of searches that had to run
+
+    def __init__(self, path: str, max_entries: int = 256) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.isfile(path):
+            try:
+                with open(path, 'rb') as f:
+                    self.entries = pickle.loads(zlib.decompress(f.read()))
+            except Exception:
+                # A corrupted or incompatible cache file is treated as an empty cache
+                self.entries = {}
+
+    # Write the cache to a temporary file then move it in place, so an interrupted run never leaves a broken file
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        temporary = self.path + ".tmp"
+        with open(temporary, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(self.entries, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(temporary, self.path)
+
+    # Wrap a search function such that it returns the cached solution when one is available for the given level
+    # The returned function has the same signature as the search function, so it can be given to the search agents.
+    def wrap(self, search_fn: Callable[..., Solution], level_path: str, algorithm: str, heuristic: Optional[Callable] = None, heuristic_name: str = "") -> Callable[..., Solution]:
+        definitions, configuration = configuration_of(search_fn)
+        with open(level_path, 'rb') as f:
+            key: CacheKey = (digest([f.read()]), algorithm, heuristic_name, configuration)
+        def cached_search(problem: Problem[S, A], state: S, *args, **kwargs) -> Solution:
+            sources = [source_of(definition) for definition in definitions]
+            code = digest([*sources, source_of(heuristic) if heuristic is not None else b"", source_of(type(problem))])
+            start = digest([str(state).encode()])
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == code and entry[1] == start:
+                self.hits += 1
+                return decode_solution(problem, state, entry[2])
+            self.misses += 1
+            solution = search_fn(problem, state, *args, **kwargs)
+            self.entries.pop(key, None)
+            self.entries[key] = (code, start, encode_solution(problem, state, solution))
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self.save()
+            return solution
+        return cached_search
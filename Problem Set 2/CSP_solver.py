@@ -1,6 +1,6 @@
 from typing import Any, Dict, List, Optional
 from CSP import Assignment, BinaryConstraint, Problem, UnaryConstraint
-from helpers.utils import NotImplemented
+from helpers.utils import NotImplemented, Deadline
 
 # This function should apply 1-Consistency to the problem.
 # In other words, it should modify the domains to only include values that satisfy their variables' unary constraints.
@@ -121,13 +121,17 @@ def minimum_remaining_values(problem: Problem, domains: Dict[str, set]) -> str:
 # IMPORTANT: To get the correct result for the explored nodes, you should check if the assignment is complete only once using "problem.is_complete"
 #            for every assignment including the initial empty assignment, EXCEPT for the assignments pruned by the forward checking.
 #            Also, if 1-Consistency deems the whole problem unsolvable, you shouldn't call "problem.is_complete" at all.
-def solve(problem: Problem) -> Optional[Assignment]:
+# An optional "deadline" (see helpers/utils.py) is checked once per assignment, if it expires the search returns None
+# and "deadline.timed_out" is set to tell that the problem was not proven unsolvable.
+def solve(problem: Problem, deadline: Optional[Deadline] = None) -> Optional[Assignment]:
     #COMMENT: Check if the problem is 1-consistent (if not, return None [the problem is unsolvable])
     if not one_consistency(problem):
         return None
     assignment = {}
     #COMMENT: define a recursive backtrack function
     def backtrack(assignment, domains, csp):
+        if deadline is not None and deadline.tick():
+            return None
         if csp.is_complete(assignment):
             return assignment
         #COMMENT: Get the variable to assign using the MRV heuristic
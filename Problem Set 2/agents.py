@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Generic
+from typing import Callable, Generic, Optional
 from game import HeuristicFunction, Game, S, A
 from helpers.mt19937 import RandomGenerator
+from helpers.utils import Deadline
 
 # This is an abstract class for all agents
 class Agent(ABC, Generic[S, A]):
@@ -23,18 +24,30 @@ class HumanAgent(Agent[S, A]):
         return self.user_input_fn(game, state)
 
 # The search agent requests the action from a search algorithm
+# If a time limit (seconds) is given, each search receives a deadline and it is cut short when the time runs out
 class SearchAgent(Agent[S, A]):
     def __init__(self,
         search_fn: Callable[[Game[S, A], S, HeuristicFunction, int], A],
         heuristic: HeuristicFunction = (lambda *_: 0), 
-        search_depth: int = -1) -> None:
+        search_depth: int = -1,
+        time_limit: Optional[float] = None) -> None:
         super().__init__()
         self.search_fn = search_fn
         self.heuristic = heuristic
         self.search_depth = search_depth
+        self.time_limit = time_limit
+        self.timed_out = False # Whether the last search was cut short by the time limit
     
     def act(self, game: Game[S, A], state: S) -> A:
-        _, action = self.search_fn(game, state, self.heuristic, self.search_depth)
+        if self.time_limit is None:
+            _, action = self.search_fn(game, state, self.heuristic, self.search_depth)
+            return action
+        deadline = Deadline(self.time_limit)
+        _, action = self.search_fn(game, state, self.heuristic, self.search_depth, deadline=deadline)
+        self.timed_out = deadline.timed_out
+        if action is None and deadline.timed_out:
+            # The time ran out before any action was fully searched, so we fall back to the first legal action
+            action = game.get_actions(state)[0]
         return action
 
 # The random agent selects actions randomly
@@ -0,0 +1,182 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from collections import deque
+from mathutils import Direction, Point
+import numpy as np
+
+# This file contains the shortest path tables used by the dungeon heuristic
+# Each cell of the layout has an id (y * width + x), and a BFS from a source cell computes two rows (arrays over the cells):
+# - distances[source][cell] is the length of the shortest path from the source to the cell (or UNREACHABLE)
+# - parents[source][cell] is the id of the cell before it on that path (or NO_PARENT for the source and the unreachable cells)
+# A row is only allocated the first time a path from its source is needed (or all the rows are computed at once by "precompute"),
+# so the memory grows with the number of queried sources instead of cells^2 (an 80x80 layout would need 312 MiB for all the rows),
+# and a path is only rebuilt from the parents when it is requested instead of storing a list of points for every pair of cells.
+# The heuristic only needs the distances and the distance fields of the paths, so the rebuilt paths are not cached.
+# The neighbors are visited in the order of "Direction", so the paths are the same as the paths found by a BFS over the points.
+# Since the tables only depend on the walkable cells, they can be saved to a file and loaded for any game on the same layout.
+# The distance from every cell to a whole path (the nearest cell of the path) is computed by a single BFS that starts
+# from all the cells of the path at once (a multi-source BFS), instead of a path lookup for every cell of the path.
+
+UNREACHABLE = -1
+NO_PARENT = -1
+
+class DistanceTable:
+    width: int
+    height: int
+    walkable: np.ndarray            # walkable[cell] is True if the cell can be walked on
+    distances: Dict[int, np.ndarray]    # distances[source][cell] (int32) for the sources whose BFS was done
+    parents: Dict[int, np.ndarray]      # parents[source][cell] (int32) for the sources whose BFS was done
+    points: List[Point]             # The point of each cell id
+    neighbors: List[List[int]]      # The walkable neighbors of each cell (in the order of "Direction")
+    path_fields: Dict[Tuple[int, ...], "PathField"]   # The distance fields of the paths (the key is the cells of the path)
+    shortest_path_fields: Dict[int, Optional["PathField"]]  # The distance fields of the shortest paths (the key is source * size + target)
+
+    def __init__(self, width: int, height: int, walkable: np.ndarray) -> None:
+        self.width, self.height = width, height
+        size = width * height
+        self.walkable = walkable
+        self.distances = {}
+        self.parents = {}
+        self.points = [Point(cell % width, cell // width) for cell in range(size)]
+        vectors = [direction.to_vector() for direction in Direction if direction != Direction.NONE]
+        self.neighbors = [
+            [(point.y + vector.y) * width + point.x + vector.x for vector in vectors
+                if 0 <= point.x + vector.x < width and 0 <= point.y + vector.y < height
+                and walkable[(point.y + vector.y) * width + point.x + vector.x]]
+            for point in self.points
+        ]
+        self.path_fields = {}
+        self.shortest_path_fields = {}
+
+    # Creates an empty table for the walkable cells of the layout
+    @staticmethod
+    def from_layout(layout) -> 'DistanceTable':
+        walkable = np.zeros(layout.width * layout.height, dtype=bool)
+        for point in layout.walkable:
+            walkable[point.y * layout.width + point.x] = True
+        return DistanceTable(layout.width, layout.height, walkable)
+
+    @property
+    def size(self) -> int:
+        return self.width * self.height
+
+    def cell(self, point: Point) -> int:
+        return point.y * self.width + point.x
+
+    # Computes the rows of the source (if they were not computed yet) and returns the distances from the source to every cell
+    def field(self, source: int) -> np.ndarray:
+        row = self.distances.get(source)
+        if row is None:
+            neighbors = self.neighbors
+            distances = [UNREACHABLE] * self.size
+            parents = [NO_PARENT] * self.size
+            distances[source] = 0
+            queue = deque([source])
+            while queue:
+                parent = queue.popleft()
+                distance = distances[parent] + 1
+                for child in neighbors[parent]:
+                    if distances[child] != UNREACHABLE: continue
+                    distances[child] = distance
+                    parents[child] = parent
+                    queue.append(child)
+            row = self.distances[source] = np.array(distances, dtype=np.int32)
+            self.parents[source] = np.array(parents, dtype=np.int32)
+        return row
+
+    # Computes the rows of all the walkable cells
+    def precompute(self):
+        for source in np.flatnonzero(self.walkable):
+            self.field(int(source))
+
+    # Returns the length of the shortest path between the two points (or UNREACHABLE)
+    def distance(self, p1: Point, p2: Point) -> int:
+        return int(self.field(self.cell(p1))[self.cell(p2)])
+
+    # Returns the cells of the shortest path between the two cells (including both ends), or None if there is no path
+    def path_cells(self, source: int, target: int) -> Optional[Tuple[int, ...]]:
+        self.field(source)
+        parents = self.parents[source]
+        if source != target and parents[target] == NO_PARENT: return None
+        cells = [target]
+        while cells[-1] != source:
+            cells.append(int(parents[cells[-1]]))
+        return tuple(reversed(cells))
+
+    # Returns the shortest path between the two points as a list of points (including both ends), or None if there is no path
+    def path(self, p1: Point, p2: Point) -> Optional[List[Point]]:
+        cells = self.path_cells(self.cell(p1), self.cell(p2))
+        if cells is None: return None
+        points = self.points
+        return [points[cell] for cell in cells]
+
+    # Returns the distance from every cell to the path (given as the cells of the path) and the index of the nearest cell of the path
+    # If several cells of the path are the nearest, the index is the smallest one (the first on the path)
+    def path_field(self, cells: Tuple[int, ...]) -> "PathField":
+        field = self.path_fields.get(cells)
+        if field is not None: return field
+        neighbors = self.neighbors
+        distances = [UNREACHABLE] * self.size
+        indices = [UNREACHABLE] * self.size
+        for index, cell in enumerate(cells):
+            if distances[cell] == UNREACHABLE:
+                distances[cell], indices[cell] = 0, index
+        # The BFS goes level by level, so every cell of the next level gets the smallest index among its neighbors in the current level,
+        # which is the smallest index among the nearest cells of the path
+        frontier = [cell for index, cell in enumerate(cells) if indices[cell] == index]
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for parent in frontier:
+                index = indices[parent]
+                for child in neighbors[parent]:
+                    if distances[child] == UNREACHABLE:
+                        distances[child], indices[child] = distance, index
+                        next_frontier.append(child)
+                    elif distances[child] == distance and index < indices[child]:
+                        indices[child] = index
+            frontier = next_frontier
+        field = self.path_fields[cells] = PathField(distances, indices)
+        return field
+
+    # Returns the distance field of the shortest path between the two points (or None if there is no path)
+    def shortest_path_field(self, p1: Point, p2: Point) -> Optional["PathField"]:
+        source, target = p1.y * self.width + p1.x, p2.y * self.width + p2.x
+        key = source * self.size + target
+        field = self.shortest_path_fields.get(key, self)
+        if field is self:
+            cells = self.path_cells(source, target)
+            field = self.shortest_path_fields[key] = None if cells is None else self.path_field(cells)
+        return field
+
+    # Saves the computed rows to a file (in the numpy ".npz" format)
+    # The file holds the list of the computed sources and their rows stacked in (sources x cells) arrays,
+    # so it only grows with the number of computed sources
+    def save(self, path: str):
+        sources = np.array(sorted(self.distances), dtype=np.int32)
+        distances = np.empty((len(sources), self.size), dtype=np.int32)
+        parents = np.empty((len(sources), self.size), dtype=np.int32)
+        for index, source in enumerate(sources):
+            distances[index] = self.distances[int(source)]
+            parents[index] = self.parents[int(source)]
+        # The file is opened here since numpy adds the ".npz" extension to the paths that do not have it
+        with open(path, "wb") as file:
+            np.savez_compressed(file, width=self.width, height=self.height, walkable=self.walkable,
+                sources=sources, distances=distances, parents=parents)
+
+    # Loads the tables saved by "save". It raises a ValueError if they were computed for another layout.
+    @staticmethod
+    def load(path: str, layout) -> 'DistanceTable':
+        table = DistanceTable.from_layout(layout)
+        with np.load(path) as data:
+            if int(data["width"]) != table.width or int(data["height"]) != table.height or not np.array_equal(data["walkable"], table.walkable):
+                raise ValueError(f"The distance tables in '{path}' were computed for another layout")
+            distances, parents = data["distances"], data["parents"]
+            for index, source in enumerate(data["sources"]):
+                table.distances[int(source)] = distances[index]
+                table.parents[int(source)] = parents[index]
+        return table
+
+class PathField(NamedTuple):
+    distances: List[int]    # distances[cell] is the distance from the cell to the nearest cell of the path (or UNREACHABLE)
+    indices: List[int]      # indices[cell] is the index (on the path) of the nearest cell of the path (or UNREACHABLE)
@@ -1,13 +1,14 @@
-from dataclasses import dataclass
-from copy import deepcopy
-from typing import Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass, field, replace
+from typing import FrozenSet, Iterable, List, Optional, Tuple
 from enum import Enum
+import math
 
 from mathutils import Direction, Point
 from game import Game
 from helpers.utils import track_call_count
 from helpers.mt19937 import RandomGenerator
 from agents import Agent
+from distances import DistanceTable, PathField, UNREACHABLE
 
 # This file contains the definition for the Dungeon Crawler game
 # In this problem, the agent can move Up, Down, Left, Right or stay idle
@@ -24,21 +25,22 @@ class DungeonTile(str, Enum):
     DAGGER = "~"
     KEY = "K"
 
+# All the state classes are immutable (frozen dataclasses with frozensets and tuples),
+# so a successor is built by sharing every part that the move did not change instead of copying the whole state.
+
 # Dungeon layout specifies the walkable locations and the exit location
-@dataclass
+# It is shared by all the states, so we disable the automatic equality to compare it by identity.
+@dataclass(eq=False, frozen=True)
 class DungeonLayout:
     width: int
     height: int
-    walkable: Set[Point]
+    walkable: FrozenSet[Point]
     exit: Point
 
-    def __deepcopy__(self, memo):
-        return self
-
 # The state of a player contains its position, whether it is alive or not and its inventory
-@dataclass
+@dataclass(frozen=True)
 class Player:
-    @dataclass
+    @dataclass(frozen=True)
     class Inventory:
         daggers: int
         coins: int
@@ -49,32 +51,25 @@ class Player:
     inventory: Inventory
 
 # The state of a monster contains its position and whether it is alive or not
-@dataclass
+@dataclass(frozen=True)
 class Monster:
     position: Point
     alive: bool
 
-# This will contain a reference to the dungeon layout and it will contain environment details that change across states such as:
-#   The player location and the locations of the monsters, remaining coins, daggers, key, etc. 
-@dataclass
-class DungeonState:
-    time: int
-    turn: int
-    layout: DungeonLayout
-    player: Player
-    coins: Set[Point]
-    daggers: Set[Point]
-    keys: Set[Point]
-    monsters: List[Monster]
-
+# Returns the turn that follows the given turn (it ignore all the dead monsters)
+def next_turn(turn: int, monsters: Tuple[Monster, ...]) -> int:
+    while turn < len(monsters):
+        if monsters[turn].alive:
+            return turn+1
+        turn += 1
+    return 0
+
+# The methods shared by the immutable dungeon state and the mutable working state (DungeonBoard)
+# They only read the fields: time, turn, layout, player, coins, daggers, keys and monsters
+class DungeonStateMethods:
     # return the next turn (it ignore all the dead monsters)
     def next_turn(self) -> int:
-        turn = self.turn
-        while turn < len(self.monsters):
-            if self.monsters[turn].alive:
-                return turn+1
-            turn += 1
-        return 0
+        return next_turn(self.turn, self.monsters)
     
     # The score is 1 point for each coin, 10 points for each monster, -0.1 points for each passing second.
     def score(self) -> int:
@@ -102,11 +97,160 @@ class DungeonState:
         header = f"Inventory: {self.player.inventory.keys} Key(s), {self.player.inventory.daggers} Dagger(s), {self.player.inventory.coins} Coin(s)\n"
         return header + '\n'.join(''.join(position_to_str(Point(x, y)) for x in range(self.layout.width)) for y in range(self.layout.height))
 
+# This will contain a reference to the dungeon layout and it will contain environment details that change across states such as:
+#   The player location and the locations of the monsters, remaining coins, daggers, key, etc. 
+@dataclass(frozen=True)
+class DungeonState(DungeonStateMethods):
+    time: int
+    turn: int
+    layout: DungeonLayout
+    player: Player
+    coins: FrozenSet[Point]
+    daggers: FrozenSet[Point]
+    keys: FrozenSet[Point]
+    monsters: Tuple[Monster, ...]
+    zobrist: int = field(compare=False, repr=False)     # The Zobrist hash of the state (see "ZobristKeys")
+
+# This is a mutable working state used by the in-place searches (see "DungeonGame.apply" and "DungeonGame.undo")
+# It has the same fields as the dungeon state but an action replaces its fields instead of creating a new state.
+# The fields still hold the immutable records, so an undo only needs to restore the previous field values.
+@dataclass
+class DungeonBoard(DungeonStateMethods):
+    time: int
+    turn: int
+    layout: DungeonLayout
+    player: Player
+    coins: FrozenSet[Point]
+    daggers: FrozenSet[Point]
+    keys: FrozenSet[Point]
+    monsters: Tuple[Monster, ...]
+    zobrist: int = field(compare=False, repr=False)
+
+    # Returns an immutable snapshot of the working state
+    def to_state(self) -> DungeonState:
+        return DungeonState(self.time, self.turn, self.layout, self.player, self.coins, self.daggers, self.keys, self.monsters, self.zobrist)
+
+# The fields of the state that an action can change: (time, turn, player, coins, daggers, keys, monsters, zobrist)
+DungeonChanges = Tuple[int, int, Player, FrozenSet[Point], FrozenSet[Point], FrozenSet[Point], Tuple[Monster, ...], int]
+
+# A compact and canonical encoding of a dungeon state (see "DungeonGame.to_key" and "DungeonGame.from_key")
+# The fields are small integers: (time, turn, player, daggers, coins, keys, coins mask, daggers mask, keys mask, *monsters) where
+# a position is encoded as its cell id (y * width + x), the player and each monster are encoded as (cell << 1) | alive,
+# and bit "cell" of each mask is set if the item is still at that cell.
+# Two states of the same dungeon have equal keys if and only if they are equal, and unlike the Zobrist hash, the key has no collisions.
+# The hash of the fields is computed once when the key is created.
+class DungeonStateKey:
+    __slots__ = ("fields", "hash")
+    fields: Tuple[int, ...]
+    hash: int
+
+    def __init__(self, fields: Tuple[int, ...]) -> None:
+        self.fields = fields
+        self.hash = hash(fields)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, DungeonStateKey) and self.hash == other.hash and self.fields == other.fields
+
+    def __hash__(self) -> int:
+        return self.hash
+
+    def __repr__(self) -> str:
+        return f"DungeonStateKey{self.fields}"
+
+    # Returns the fields as bytes, where each field is a variable length unsigned integer (7 bits per byte, LEB128)
+    def to_bytes(self) -> bytes:
+        data = bytearray()
+        for value in self.fields:
+            while value > 0x7f:
+                data.append((value & 0x7f) | 0x80)
+                value >>= 7
+            data.append(value)
+        return bytes(data)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'DungeonStateKey':
+        fields, value, shift = [], 0, 0
+        for byte in data:
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if byte < 0x80:
+                fields.append(value)
+                value, shift = 0, 0
+        return DungeonStateKey(tuple(fields))
+
+# The random keys used for the Zobrist hashing of the dungeon states
+# The hash of a state is the XOR of the keys of its features: the player position, the inventory counts, each remaining coin, dagger and key,
+# the position of each monster, the dead player and monsters, the turn and the time.
+# Since XOR is its own inverse, an action updates the hash of the state by XORing out the old features and XORing in the new ones,
+# so the hash of a successor costs a few XORs instead of a pass over the whole state.
+# The keys are generated from a fixed seed, so the same dungeon always gets the same hashes (even in another process).
+class ZobristKeys:
+    width: int
+    player: List[int]               # The key of the player at each cell (indexed by y * width + x)
+    coin: List[int]                 # The key of a coin at each cell
+    dagger: List[int]               # The key of a dagger at each cell
+    key: List[int]                  # The key of a key at each cell
+    monsters: List[List[int]]       # The key of each monster at each cell
+    dead_player: int
+    dead_monsters: List[int]
+    coins_count: List[int]          # The key of each possible number of collected coins
+    daggers_count: List[int]        # The key of each possible number of carried daggers
+    keys_count: List[int]           # The key of each possible number of collected keys
+    turn: List[int]                 # The key of each turn
+
+    SEED = 0x5EED
+
+    def __init__(self, layout: DungeonLayout, initial_state: DungeonState, seed: int = SEED) -> None:
+        rng = RandomGenerator(seed)
+        random_key = lambda: (rng.generate() << 32) | rng.generate()
+        cells = layout.width * layout.height
+        self.width = layout.width
+        self.player = [random_key() for _ in range(cells)]
+        self.coin = [random_key() for _ in range(cells)]
+        self.dagger = [random_key() for _ in range(cells)]
+        self.key = [random_key() for _ in range(cells)]
+        self.monsters = [[random_key() for _ in range(cells)] for _ in initial_state.monsters]
+        self.dead_player = random_key()
+        self.dead_monsters = [random_key() for _ in initial_state.monsters]
+        # The inventory can never hold more items than the dungeon contains
+        self.coins_count = [random_key() for _ in range(len(initial_state.coins) + 1)]
+        self.daggers_count = [random_key() for _ in range(len(initial_state.daggers) + 1)]
+        self.keys_count = [random_key() for _ in range(len(initial_state.keys) + 1)]
+        self.turn = [random_key() for _ in range(len(initial_state.monsters) + 1)]
+
+    def cell(self, position: Point) -> int:
+        return position.y * self.width + position.x
+
+    # The time is not bounded, so its key is computed by a multiplicative hash instead of being stored
+    @staticmethod
+    def time(time: int) -> int:
+        return (time * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+
+    # Computes the hash of a state from scratch (it only reads the fields, so the stored hash may be missing)
+    def hash(self, state: DungeonStateMethods) -> int:
+        player, inventory = state.player, state.player.inventory
+        value = self.player[self.cell(player.position)] ^ self.turn[state.turn] ^ self.time(state.time)
+        value ^= self.coins_count[inventory.coins] ^ self.daggers_count[inventory.daggers] ^ self.keys_count[inventory.keys]
+        if not player.alive:
+            value ^= self.dead_player
+        for position in state.coins:
+            value ^= self.coin[self.cell(position)]
+        for position in state.daggers:
+            value ^= self.dagger[self.cell(position)]
+        for position in state.keys:
+            value ^= self.key[self.cell(position)]
+        for index, monster in enumerate(state.monsters):
+            value ^= self.monsters[index][self.cell(monster.position)]
+            if not monster.alive:
+                value ^= self.dead_monsters[index]
+        return value
+
 # This is the implementation of the dungeon game
 class DungeonGame(Game[DungeonState, Direction]):
     # The problem will contain the dungeon layout and the inital state
     layout: DungeonLayout
     initial_state: DungeonState
+    zobrist: ZobristKeys
 
     def get_initial_state(self) -> DungeonState:
         return self.initial_state
@@ -135,6 +279,16 @@ class DungeonGame(Game[DungeonState, Direction]):
     def get_turn(self, state: DungeonState) -> int:
         return state.turn
 
+    # Returns bounds on the values of the state and the states that follow it (including the values of "dungeon_heuristic")
+    # The best value is a win after collecting all the remaining coins and killing all the monsters (and the time never goes back).
+    # The searches only use the upper bound (expectimax has no min nodes), so the lower bound is left unbounded
+    # instead of checking the paths to every goal (the heuristic adds a huge penalty for an unreachable goal).
+    def get_value_bounds(self, state: DungeonState) -> Tuple[float, float]:
+        INFINITY = 1e8
+        # We add 1 to the upper bound so the rounding errors of the score cannot exceed it
+        upper = INFINITY + state.player.inventory.coins + len(state.coins) + 10 * len(state.monsters) - 0.1 * state.time + 1
+        return -math.inf, upper
+
     def get_actions(self, state: DungeonState) -> Iterable[Direction]:
         if state.turn == 0:
             # Find an return actions to be done by the player
@@ -153,55 +307,168 @@ class DungeonGame(Game[DungeonState, Direction]):
             return [direction for direction, position in positions if position in state.layout.walkable and position not in monster_locations]
 
     def get_successor(self, state: DungeonState, action: Direction) -> DungeonState:
-        state = deepcopy(state)
+        time, turn, player, coins, daggers, keys, monsters, zobrist = self.resolve_action(state, action)
+        successor = DungeonState(time, turn, state.layout, player, coins, daggers, keys, monsters, zobrist)
+        # If the key of the state was requested, the key of the successor is derived from it (see "to_key")
+        key = state.__dict__.get("_key")
+        if key is not None:
+            object.__setattr__(successor, "_key", self.successor_key(state, key, successor))
+        return successor
+
+    # Returns the compact key of the state (see "DungeonStateKey")
+    # The key of an immutable state is cached in the state. Once a state has a key, the keys of its successors are derived
+    # from it when they are created, by only encoding again the parts that the action changed.
+    def to_key(self, state: DungeonStateMethods) -> DungeonStateKey:
+        key = state.__dict__.get("_key") if isinstance(state, DungeonState) else None
+        if key is not None: return key
+        width = self.layout.width
+        cell = lambda position: position.y * width + position.x
+        mask = lambda positions: sum(1 << cell(position) for position in positions)
+        player, inventory = state.player, state.player.inventory
+        key = DungeonStateKey((
+            state.time, state.turn, (cell(player.position) << 1) | player.alive,
+            inventory.daggers, inventory.coins, inventory.keys,
+            mask(state.coins), mask(state.daggers), mask(state.keys),
+            *((cell(monster.position) << 1) | monster.alive for monster in state.monsters)
+        ))
+        if isinstance(state, DungeonState):
+            object.__setattr__(state, "_key", key)
+        return key
+
+    # Returns the key of the successor given the key of the state
+    # The records that the action did not change are shared by the two states, so they keep their encoding.
+    # An item can only be removed by the player walking over it, so a changed item set only loses the player's new cell.
+    def successor_key(self, state: DungeonStateMethods, key: DungeonStateKey, successor: DungeonStateMethods) -> DungeonStateKey:
+        width = self.layout.width
+        fields = key.fields
+        player, coins_mask, daggers_mask, keys_mask = fields[2], fields[6], fields[7], fields[8]
+        daggers, coins, keys = fields[3], fields[4], fields[5]
+        if successor.player is not state.player:
+            new_player, inventory = successor.player, successor.player.inventory
+            player = ((new_player.position.y * width + new_player.position.x) << 1) | new_player.alive
+            daggers, coins, keys = inventory.daggers, inventory.coins, inventory.keys
+            bit = 1 << (player >> 1)
+            if successor.coins is not state.coins: coins_mask &= ~bit
+            if successor.daggers is not state.daggers: daggers_mask &= ~bit
+            if successor.keys is not state.keys: keys_mask &= ~bit
+        if successor.monsters is state.monsters:
+            monsters = fields[9:]
+        else:
+            monsters = tuple((monster.position.y * width + monster.position.x) << 1 | monster.alive for monster in successor.monsters)
+        return DungeonStateKey((successor.time, successor.turn, player, daggers, coins, keys, coins_mask, daggers_mask, keys_mask, *monsters))
+
+    # Returns the state encoded by the key
+    def from_key(self, key: DungeonStateKey) -> DungeonState:
+        width, size = self.layout.width, self.layout.width * self.layout.height
+        point = lambda cell: Point(cell % width, cell // width)
+        positions = lambda mask: frozenset(point(cell) for cell in range(size) if (mask >> cell) & 1)
+        time, turn, player, daggers, coins, keys, coins_mask, daggers_mask, keys_mask, *monsters = key.fields
+        state = DungeonState(
+            time, turn, self.layout,
+            Player(point(player >> 1), bool(player & 1), Player.Inventory(daggers, coins, keys)),
+            positions(coins_mask), positions(daggers_mask), positions(keys_mask),
+            tuple(Monster(point(monster >> 1), bool(monster & 1)) for monster in monsters),
+            0
+        )
+        state = replace(state, zobrist=self.zobrist.hash(state))
+        object.__setattr__(state, "_key", key)
+        return state
+
+    # The Zobrist hash is maintained incrementally by "resolve_action"
+    def get_hash(self, state: DungeonStateMethods) -> int:
+        return state.zobrist
+
+    # Returns a mutable copy of the state for the in-place searches
+    def make_working_state(self, state: DungeonState) -> DungeonBoard:
+        return DungeonBoard(state.time, state.turn, state.layout, state.player, state.coins, state.daggers, state.keys, state.monsters, state.zobrist)
+
+    # Applies the action to the working state and returns the previous field values to undo it
+    def apply(self, board: DungeonBoard, action: Direction) -> DungeonChanges:
+        token = (board.time, board.turn, board.player, board.coins, board.daggers, board.keys, board.monsters, board.zobrist)
+        board.time, board.turn, board.player, board.coins, board.daggers, board.keys, board.monsters, board.zobrist = self.resolve_action(board, action)
+        return token
+
+    def undo(self, board: DungeonBoard, token: DungeonChanges):
+        board.time, board.turn, board.player, board.coins, board.daggers, board.keys, board.monsters, board.zobrist = token
+
+    # Returns the fields of the state after applying the action (used by both "get_successor" and "apply")
+    # The state can be a "DungeonState" or a "DungeonBoard" and it is not modified.
+    def resolve_action(self, state: DungeonStateMethods, action: Direction) -> DungeonChanges:
+        # Since the records are immutable, we only create new objects for the parts changed by the action
+        player, coins, daggers, keys, monsters = state.player, state.coins, state.daggers, state.keys, state.monsters
+        # The hash is updated along with every changed feature (see "ZobristKeys")
+        zobrist, table = state.zobrist, self.zobrist
         current_turn = state.turn
         if current_turn == 0:
             # This action is done by the player
-            new_position = state.player.position + action.to_vector()
-            state.player.position = new_position
-            if new_position in state.coins:
+            new_position = player.position + action.to_vector()
+            alive = player.alive
+            daggers_count, coins_count, keys_count = player.inventory.daggers, player.inventory.coins, player.inventory.keys
+            new_cell = table.cell(new_position)
+            zobrist ^= table.player[table.cell(player.position)] ^ table.player[new_cell]
+            if new_position in coins:
                 # If we walk over a coin, we take it
-                state.coins.remove(new_position)
-                state.player.inventory.coins += 1
-            if new_position in state.daggers:
+                coins = coins - {new_position}
+                coins_count += 1
+                zobrist ^= table.coin[new_cell]
+            if new_position in daggers:
                 # If we walk over a dagger, we take it
-                state.daggers.remove(new_position)
-                state.player.inventory.daggers += 1
-            if new_position in state.keys:
+                daggers = daggers - {new_position}
+                daggers_count += 1
+                zobrist ^= table.dagger[new_cell]
+            if new_position in keys:
                 # If we walk over a dagger, we take it
-                state.keys.remove(new_position)
-                state.player.inventory.keys += 1
+                keys = keys - {new_position}
+                keys_count += 1
+                zobrist ^= table.key[new_cell]
             # Find the monsters at the player position
-            monsters_at_player = [monster for monster in state.monsters if monster.position == new_position and monster.alive]
+            monsters_at_player = [index for index, monster in enumerate(monsters) if monster.position == new_position and monster.alive]
             if monsters_at_player:
-                if state.player.inventory.daggers < len(monsters_at_player):
+                if daggers_count < len(monsters_at_player):
                     # If we encounter a monster and we don't have a dagger, we die
-                    state.player.inventory.daggers = 0
-                    state.player.alive = False
+                    daggers_count = 0
+                    alive = False
+                    zobrist ^= table.dead_player
                 else:
                     # If we encounter a monster and we have a dagger, we kill it
-                    state.player.inventory.daggers -= len(monsters_at_player)
-                    for monster in monsters_at_player:
-                        monster.alive = False
+                    daggers_count -= len(monsters_at_player)
+                    monsters = tuple(Monster(monster.position, False) if index in monsters_at_player else monster for index, monster in enumerate(monsters))
+                    for index in monsters_at_player:
+                        zobrist ^= table.dead_monsters[index]
+            inventory = player.inventory
+            if (daggers_count, coins_count, keys_count) != (inventory.daggers, inventory.coins, inventory.keys):
+                zobrist ^= table.daggers_count[inventory.daggers] ^ table.daggers_count[daggers_count]
+                zobrist ^= table.coins_count[inventory.coins] ^ table.coins_count[coins_count]
+                zobrist ^= table.keys_count[inventory.keys] ^ table.keys_count[keys_count]
+                inventory = Player.Inventory(daggers_count, coins_count, keys_count)
+            player = Player(new_position, alive, inventory)
         else:
             # This action is done by a monster
-            monster = state.monsters[current_turn - 1]
+            index = current_turn - 1
+            monster = monsters[index]
             new_position = monster.position + action.to_vector()
-            monster.position = new_position
-            if new_position == state.player.position:
-                if state.player.inventory.daggers != 0:
+            alive = monster.alive
+            zobrist ^= table.monsters[index][table.cell(monster.position)] ^ table.monsters[index][table.cell(new_position)]
+            if new_position == player.position:
+                inventory = player.inventory
+                if inventory.daggers != 0:
                     # If we encounter a player and they have a dagger, we die
-                    monster.alive = False
-                    state.player.inventory.daggers -= 1
+                    alive = False
+                    player = Player(player.position, player.alive, Player.Inventory(inventory.daggers - 1, inventory.coins, inventory.keys))
+                    zobrist ^= table.dead_monsters[index] ^ table.daggers_count[inventory.daggers] ^ table.daggers_count[inventory.daggers - 1]
                 else:
                     # If we encounter a player and they don't have a dagger, we eat them
-                    state.player.alive = False
+                    player = Player(player.position, False, inventory)
+                    zobrist ^= table.dead_player
+            monsters = monsters[:index] + (Monster(new_position, alive),) + monsters[index+1:]
         # Advance the turn
-        state.turn = state.next_turn()
-        if state.turn == 0:
-            # if the new turn is 0 (the player's turn), we advance the clock 
-            state.time += 1
-        return state
+        turn = next_turn(current_turn, monsters)
+        # if the new turn is 0 (the player's turn), we advance the clock 
+        time = state.time + 1 if turn == 0 else state.time
+        zobrist ^= table.turn[current_turn] ^ table.turn[turn]
+        if time != state.time:
+            zobrist ^= table.time(state.time) ^ table.time(time)
+        return time, turn, player, coins, daggers, keys, monsters, zobrist
 
     # Read a dungeon problem from text containing a grid of tiles
     @staticmethod
@@ -229,9 +496,11 @@ class DungeonGame(Game[DungeonState, Direction]):
                     elif char == DungeonTile.EXIT:
                         exit = Point(x, y)
         problem = DungeonGame()
-        problem.layout = DungeonLayout(width, height, walkable, exit)
+        problem.layout = DungeonLayout(width, height, frozenset(walkable), exit)
         player = Player(player, True, Player.Inventory(0, 0, 0))
-        problem.initial_state = DungeonState(0, 0, problem.layout, player, coins, daggers, keys, monsters)
+        problem.initial_state = DungeonState(0, 0, problem.layout, player, frozenset(coins), frozenset(daggers), frozenset(keys), tuple(monsters), 0)
+        problem.zobrist = ZobristKeys(problem.layout, problem.initial_state)
+        problem.initial_state = replace(problem.initial_state, zobrist=problem.zobrist.hash(problem.initial_state))
         return problem
 
     # Read a dungeon problem from file containing a grid of tiles
@@ -280,47 +549,75 @@ class MonsterAgent(Agent):
 def path_length(path) -> int:
     return 0xffffffff if path is None else len(path)-1
 
+# Returns the shortest path tables of the game (see distances.py)
+# They are created the first time they are needed and cached inside the game object
+def get_distance_table(game: DungeonGame) -> DistanceTable:
+    cache = game.cache()
+    table = cache.get("distances")
+    if table is None:
+        table = cache["distances"] = DistanceTable.from_layout(game.layout)
+    return table
+
+# Replaces the shortest path tables of the game with the tables saved in the file
+# If the file does not exist, the tables are computed for all the cells and saved to the file
+def load_distance_table(game: DungeonGame, path: str) -> DistanceTable:
+    import os
+    if os.path.exists(path):
+        table = DistanceTable.load(path, game.layout)
+    else:
+        table = DistanceTable.from_layout(game.layout)
+        table.precompute()
+        table.save(path)
+    game.cache()["distances"] = table
+    return table
+
 # Return the path between two points in the dungeom
-# The result is cached inside the game object
+# The path is rebuilt from the shortest path tables cached inside the game object
 def compute_path(game: DungeonGame, p1: Point, p2: Point) -> List[Point]:
-    cache = game.cache()
-    if p1 not in cache:
-        from collections import deque
-        path_map = {p1: [p1]}
-        queue = deque([p1])
-        while queue:
-            parent = queue.popleft()
-            path = path_map[parent]
-            for direction in Direction:
-                child = parent + direction.to_vector()
-                if child in path_map or child not in game.layout.walkable:
-                    continue
-                path_map[child] = path + [child]
-                queue.append(child)
-        cache[p1] = path_map
-    return cache[p1].get(p2, None)
+    return get_distance_table(game).path(p1, p2)
+
+# Return the length of the path between two points in the dungeon (the same as "path_length(compute_path(game, p1, p2))")
+# It is read from the shortest path tables without rebuilding the path
+def compute_distance(game: DungeonGame, p1: Point, p2: Point) -> int:
+    distance = get_distance_table(game).distance(p1, p2)
+    return path_length(None) if distance == UNREACHABLE else distance
+
+# Returns the distance field of the path (see "DistanceTable.path_field")
+def compute_path_field(game: DungeonGame, path: List[Point]) -> PathField:
+    width = game.layout.width
+    return get_distance_table(game).path_field(tuple(point.y * width + point.x for point in path))
 
 # Finds the shortest path from a point to a path in the dungeon
+# If several points of the path are the nearest, the path goes to the first of them
 def path_to_path(game: DungeonGame, p1: Point, path: List[Point]):
     if path is None: return None
-    paths = [compute_path(game, p1, p2) for p2 in path]
-    _, _, shortest = min((path_length(path), index, path) for index, path in enumerate(paths))
-    return shortest
+    field = compute_path_field(game, path)
+    index = field.indices[p1.y * game.layout.width + p1.x]
+    if index == UNREACHABLE: return None
+    return compute_path(game, p1, path[index])
 
 # Checks if monsters can reach the player while traversing the shortest path to a goal point
 # Returns the number of monster that endanger the player and the length of the player's path
+# The distance field of the player's path is cached by the player's position and the goal
 def path_safety(game: DungeonGame, state: DungeonState, goal: Point):
-    path = compute_path(game, state.player.position, goal)
-    length = path_length(path)
-    # For each alive monster, find the shortest path from the the monster to the player's path
-    monster_paths = [path_to_path(game, monster.position, path) for monster in state.monsters if monster.alive]
-    # Find how long the monster will take to reach the player's path
-    monster_path_lengths = [path_length(monster_path) for monster_path in monster_paths]
-    # Find how it will take the player to get past the monster encounter position
-    monster_encounter_distance = [path.index(monster_path[-1]) for monster_path in monster_paths]
-    # Count dangerous monsters (the ones that can reach the player path before the player can outpace them)
-    danger = sum(encounter >= distance for encounter, distance in zip(monster_encounter_distance, monster_path_lengths))
-    return danger, length
+    length = compute_distance(game, state.player.position, goal)
+    field = get_distance_table(game).shortest_path_field(state.player.position, goal)
+    if field is None: return 0, length
+    return path_danger(game, field, state.monsters), length
+
+# Returns the number of alive monsters that can reach the player's path (given by its distance field) before the player gets past them
+def path_danger(game: DungeonGame, field: PathField, monsters: Tuple[Monster, ...]) -> int:
+    width = game.layout.width
+    danger = 0
+    for monster in monsters:
+        if not monster.alive: continue
+        # Find how long the monster will take to reach the player's path, and where it reaches it
+        # The index of the encounter position is how long it will take the player to get past it
+        cell = monster.position.y * width + monster.position.x
+        distance = field.distances[cell]
+        # Count dangerous monsters (the ones that can reach the player path before the player can outpace them)
+        if distance != UNREACHABLE and field.indices[cell] >= distance: danger += 1
+    return danger
 
 # Returns a heuristic value for the dungeon game state
 # Argument:
@@ -328,6 +625,8 @@ def path_safety(game: DungeonGame, state: DungeonState, goal: Point):
 # - state: the state to evaluate
 # - agent: the agent for which we are evaluating the state. For example, if the value is high for the player, it should be low for the monster
 # Returns the heuristic value of the state for the given agent 
+# The states are evaluated one at a time (the searches call the heuristic for each successor). Evaluating the siblings together
+# does not pay off: a state only needs a few table lookups and cached path fields, and a state has at most five siblings.
 def dungeon_heuristic(game: DungeonGame, state: DungeonState, agent: int) -> float:
     area = state.layout.width * state.layout.height
 
@@ -352,7 +651,7 @@ def dungeon_heuristic(game: DungeonGame, state: DungeonState, agent: int) -> flo
 
     # find the distance to the nearest monster
     if alive_monsters:
-        nearest_monster = min(path_length(compute_path(game, state.player.position, monster.position)) for monster in alive_monsters)
+        nearest_monster = min(compute_distance(game, state.player.position, monster.position) for monster in alive_monsters)
     else:
         nearest_monster = area
     
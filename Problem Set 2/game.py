@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, Iterable, List, Optional, Tuple, TypeVar, Union
+from typing import Any, Callable, Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar, Union
 from helpers.utils import CacheContainer, with_cache
+import math
 
 # S and A are used for generic typing where S represents the state type and A represents the action type
 S = TypeVar("S")
@@ -48,6 +49,34 @@ class Game(ABC, Generic[S, A], CacheContainer):
     def get_successor(self, state: S, action: A) -> S:
         pass
 
+    # This function returns a hashable key that identifies the state (used by the transposition tables in transposition.py)
+    # Two states that can be reached by different sequences of actions must have the same key if they are the same state.
+    # It is optional and the games that support it should make it cheap (e.g. by maintaining the key incrementally).
+    def get_hash(self, state: S) -> Hashable:
+        raise NotImplementedError(f"{type(self).__name__} does not support state hashing")
+
+    # This function returns a lower and an upper bound on the values (for agent 0) of the state and of all the states that follow it
+    # The bounds must also contain the heuristic values of these states, since the search uses them at the depth cutoff.
+    # They are used to prune the chance nodes (see expectimax_with_pruning), and the tighter they are, the more is pruned.
+    def get_value_bounds(self, state: S) -> Tuple[float, float]:
+        return -math.inf, math.inf
+
+    # The following functions are an optional protocol for the searches that modify a single working state in place
+    # instead of creating a successor for every node (see the "_in_place" searches in search.py).
+    # The working state must be accepted by "is_terminal", "get_turn", "get_actions" and the heuristic functions.
+
+    # This function returns a working state (which may be modified in place) equivalent to the given state
+    def make_working_state(self, state: S) -> S:
+        raise NotImplementedError(f"{type(self).__name__} does not support in-place moves")
+
+    # This function applies the action to the working state and returns a token that "undo" uses to restore it
+    def apply(self, state: S, action: A) -> Any:
+        raise NotImplementedError(f"{type(self).__name__} does not support in-place moves")
+
+    # This function restores the working state to what it was before the "apply" call that returned the token
+    def undo(self, state: S, token: Any):
+        raise NotImplementedError(f"{type(self).__name__} does not support in-place moves")
+
 # A heuristic function which estimates the value of a given state for a certain agent within a certain game.
 # E.g. if the heuristic function returns a high value for a certain agent, it should return low values for their enemies.
 HeuristicFunction = Callable[[Game[S, A], S, int], float]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from typing import Any, Dict, List, Optional, Tuple
-from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function
+from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function, set_probes_enabled
 
 ########################################################
 ##                  PART 2: CSP                     ##
@@ -8,6 +8,9 @@ from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_
 from CSP import UnaryConstraint, Assignment
 from sudoku import SudokuProblem
 
+# The explored assignments are read from the probe on "is_complete", so it is enabled for the tests
+set_probes_enabled(True, "Problem.is_complete")
+
 # A Utility function to verify the type of domains in a Sudoku Problem
 def check_sudoku_domains_type(domains: Dict[str, set]):
     if not isinstance(domains, dict):
@@ -267,6 +270,9 @@ from tree import TreeGame, TreeNode, tree_heuristic
 from dungeon import DungeonGame, Direction, dungeon_heuristic
 from .pruned_tree import pruned_tree_string
 
+# The explored nodes are read from the probes on "is_terminal", so they are enabled for the tests
+set_probes_enabled(True, "TreeGame.is_terminal", "DungeonGame.is_terminal")
+
 # Checks if two floating point numbers are almost equal
 def approx_eq(output, expected):
     return abs(output - expected)/(abs(output) + abs(expected)) < 1e-8
@@ -289,6 +295,30 @@ def run_search_for_tree(
     
     return value, action, [node.name for node in explored]
 
+# Runs a testcase on a tree game with a search that works on a single working state (see the "_in_place" searches)
+# The working state is a cursor that moves during the search, so the recorded calls would all show its final node.
+# Instead, the name of the node is read when "is_terminal" is called.
+def run_in_place_search_for_tree(
+    function_path: str, 
+    game: TreeGame) -> Tuple[float, str, List[str]]:
+
+    explored = []
+    is_terminal = game.is_terminal
+    def recording_is_terminal(state):
+        explored.append(state.name)
+        return is_terminal(state)
+    game.is_terminal = recording_is_terminal # The instance attribute hides the method for this game only
+
+    search_fn = load_function(function_path) # Load the search function
+    
+    initial_state = game.get_initial_state() # Get the initial state
+    # Search without a depth limit
+    value, action = search_fn(game, initial_state, tree_heuristic, -1)
+
+    fetch_recorded_calls(TreeGame.is_terminal) # Clear the recorded calls
+    
+    return value, action, explored
+
 # Compare a testcase result with the expected output on a tree game
 def compare_search_results_for_tree(
     output: Tuple[float, str, List[str]],
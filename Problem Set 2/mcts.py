@@ -0,0 +1,240 @@
+from typing import Dict, Generic, List, Optional, Tuple
+from agents import Agent
+from game import HeuristicFunction, Game, S, A
+from helpers.mt19937 import RandomGenerator
+from helpers.utils import Deadline
+import math, multiprocessing, queue
+
+# This file contains a Monte Carlo Tree Search (UCT) agent
+# Instead of searching every action to a fixed depth, each iteration of MCTS:
+# 1. Selects a path from the root: at the nodes of agent 0, it picks the child with the best UCB1 score (the mean reward plus
+#    an exploration bonus for the rarely visited children). The other agents (the monsters) act randomly, so their actions are sampled.
+# 2. Expands the first node that has an untried action by adding a child for it.
+# 3. Plays a fast rollout from the new child with a random policy until a terminal state or the rollout depth.
+# 4. Backs up the reward of the rollout to all the nodes on the path.
+# The rewards are between 0 and 1: the value of the final state (its terminal value or its heuristic value) is squashed with a sigmoid.
+# After the agent acts, the subtree of the state reached after all the other agents acted is kept for the next move.
+# With "workers" > 1, the iterations are split between processes that search from the same root (root parallelisation),
+# and the statistics of the root children are merged at the end to select the action.
+
+# Returns the sigmoid of the value (clamped so the exponent cannot overflow)
+def squash(value: float, scale: float) -> float:
+    x = max(-60.0, min(60.0, value / scale))
+    return 1 / (1 + math.exp(-x))
+
+class MCTSNode(Generic[S, A]):
+    state: S
+    children: Dict[A, "MCTSNode[S, A]"]
+    untried: Optional[List[A]]      # The actions of agent 0 that have no child yet (None for the nodes of the other agents)
+    visits: int
+    total: float                    # The sum of the rewards backed up through this node
+
+    def __init__(self, game: Game[S, A], state: S) -> None:
+        self.state = state
+        self.children = {}
+        self.untried = list(game.get_actions(state)) if game.get_turn(state) == 0 else None
+        self.visits = 0
+        self.total = 0
+
+# The rollout policy is a random walk like the "MonsterAgent": each agent keeps moving in the same direction
+# with probability "persistence" (if the action is still possible), otherwise it picks a random action
+class RolloutPolicy(Generic[S, A]):
+    rng: RandomGenerator
+    persistence: float
+    last: Dict[int, A]                  # The last action of each agent in the current rollout
+
+    def __init__(self, rng: RandomGenerator, persistence: float) -> None:
+        self.rng = rng
+        self.persistence = persistence
+        self.last = {}
+
+    def reset(self):
+        self.last.clear()
+
+    def act(self, game: Game[S, A], state: S) -> A:
+        agent = game.get_turn(state)
+        actions = game.get_actions(state)
+        last = self.last.get(agent)
+        if last is not None and last in actions and self.rng.float() < self.persistence:
+            return last
+        action = actions[self.rng.int(0, len(actions) - 1)]
+        self.last[agent] = action
+        return action
+
+class MCTSAgent(Agent[S, A]):
+    heuristic: Optional[HeuristicFunction]
+    iterations: int                 # The number of iterations per move (ignored if there is a time limit)
+    time_limit: Optional[float]     # The time (seconds) per move
+    exploration: float              # The weight of the exploration bonus in UCB1
+    rollout_depth: int              # The maximum number of actions in a rollout (-1 means until a terminal state)
+    value_scale: float              # The value that gets a reward of about 0.73 (the values are divided by it before the sigmoid)
+    workers: int                    # The number of processes searching in parallel
+    reuse: bool                     # Whether the subtree of the reached state is kept between moves
+    seed: int
+    root: Optional[MCTSNode[S, A]]
+    # Statistics
+    moves: int
+    total_iterations: int
+    reused: int                     # The number of moves that started from a kept subtree
+    reused_visits: int              # The total number of visits of the kept subtrees
+
+    def __init__(self,
+        heuristic: Optional[HeuristicFunction] = None,
+        iterations: int = 1000,
+        time_limit: Optional[float] = None,
+        exploration: float = math.sqrt(2),
+        rollout_depth: int = 40,
+        value_scale: float = 50,
+        persistence: float = 0.8,
+        workers: int = 1,
+        reuse: bool = True,
+        seed: int = 0) -> None:
+        super().__init__()
+        self.heuristic = heuristic
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.value_scale = value_scale
+        self.persistence = persistence
+        self.workers = max(1, workers)
+        self.reuse = reuse
+        self.seed = seed
+        self.root = None
+        self.moves = self.total_iterations = self.reused = self.reused_visits = 0
+
+    # Returns the kept node whose state is the given state (the root's chosen child or one of the nodes below it before the next turn of agent 0)
+    def find_root(self, game: Game[S, A], state: S) -> Optional[MCTSNode[S, A]]:
+        if self.root is None: return None
+        frontier = [self.root]
+        while frontier:
+            node = frontier.pop()
+            if node.state == state: return node
+            frontier.extend(child for child in node.children.values() if game.get_turn(child.state) != 0 or child.state == state)
+        return None
+
+    # Runs one iteration (selection, expansion, rollout, backup) from the root
+    def iterate(self, game: Game[S, A], root: MCTSNode[S, A], rng: RandomGenerator, policy: RolloutPolicy[S, A]):
+        node, path = root, [root]
+        # Selection and expansion
+        while True:
+            terminal, values = game.is_terminal(node.state)
+            if terminal: break
+            if node.untried is None:
+                # The other agents act randomly, so their action is sampled
+                actions = game.get_actions(node.state)
+                action = actions[rng.int(0, len(actions) - 1)]
+                child = node.children.get(action)
+                if child is None:
+                    child = node.children[action] = MCTSNode(game, game.get_successor(node.state, action))
+                    path.append(child)
+                    node = child
+                    break
+            elif node.untried:
+                action = node.untried.pop(rng.int(0, len(node.untried) - 1))
+                child = node.children[action] = MCTSNode(game, game.get_successor(node.state, action))
+                path.append(child)
+                node = child
+                break
+            else:
+                # Every action was tried, so select the child with the best UCB1 score
+                log_visits, exploration = math.log(node.visits), self.exploration
+                child = max(
+                    node.children.values(),
+                    key=lambda child: child.total / child.visits + exploration * math.sqrt(log_visits / child.visits)
+                )
+            path.append(child)
+            node = child
+        # Rollout
+        state = node.state
+        policy.reset()
+        depth = 0
+        while True:
+            terminal, values = game.is_terminal(state)
+            if terminal:
+                value = values[0]
+                break
+            if depth == self.rollout_depth:
+                value = 0 if self.heuristic is None else self.heuristic(game, state, 0)
+                break
+            state = game.get_successor(state, policy.act(game, state))
+            depth += 1
+        reward = squash(value, self.value_scale)
+        # Backup
+        for visited in path:
+            visited.visits += 1
+            visited.total += reward
+
+    # Runs the iterations from the root until the budget is spent and returns the number of iterations
+    def search(self, game: Game[S, A], root: MCTSNode[S, A], iterations: int, seed: int) -> int:
+        rng = RandomGenerator(seed)
+        policy = RolloutPolicy(rng, self.persistence)
+        deadline = None if self.time_limit is None else Deadline(self.time_limit, check_every=1)
+        count = 0
+        while (count < iterations) if deadline is None else not deadline.tick():
+            self.iterate(game, root, rng, policy)
+            count += 1
+        return count
+
+    def act(self, game: Game[S, A], state: S) -> A:
+        root = self.find_root(game, state) if self.reuse else None
+        if root is None:
+            root = MCTSNode(game, state)
+        else:
+            self.reused += 1
+            self.reused_visits += root.visits
+        seed = self.seed + self.moves * (self.workers + 1)
+        if self.workers == 1:
+            self.total_iterations += self.search(game, root, self.iterations, seed)
+            stats = {action: (child.visits, child.total) for action, child in root.children.items()}
+        else:
+            stats = self.parallel_search(game, root, seed)
+        self.moves += 1
+        # The action with the most visits is the most robust choice
+        action = max(game.get_actions(state), key=lambda action: stats.get(action, (0, 0))[0])
+        self.root = root.children.get(action) if self.reuse else None
+        return action
+
+    # Searches in "workers" processes (including this one) from the same root and returns the merged statistics of the root children
+    # The workers are forked, so they start from a copy of the kept subtree and only their new visits are merged
+    def parallel_search(self, game: Game[S, A], root: MCTSNode[S, A], seed: int) -> Dict[A, Tuple[int, float]]:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        results = context.Queue()
+        actions = list(game.get_actions(root.state))
+        before = [(root.children[action].visits, root.children[action].total) if action in root.children else (0, 0) for action in actions]
+        share = max(1, self.iterations // self.workers)
+        processes = [
+            context.Process(target=_search_worker, args=(results, self, game, root, actions, share, seed + index), daemon=True)
+            for index in range(1, self.workers)
+        ]
+        for process in processes:
+            process.start()
+        self.total_iterations += self.search(game, root, share, seed)
+        stats = {action: (root.children[action].visits, root.children[action].total) for action in actions if action in root.children}
+        for _ in processes:
+            try:
+                count, worker_stats = results.get(timeout=None if self.time_limit is None else self.time_limit + 10)
+            except queue.Empty:
+                break
+            self.total_iterations += count
+            # The actions are sent as indices since some action types cannot be pickled
+            for index, (visits, total) in enumerate(worker_stats):
+                old_visits, old_total = before[index]
+                merged_visits, merged_total = stats.get(actions[index], (0, 0))
+                stats[actions[index]] = (merged_visits + visits - old_visits, merged_total + total - old_total)
+        for process in processes:
+            if process.is_alive(): process.terminate()
+            process.join()
+        return stats
+
+    # Returns a human readable summary of the statistics
+    def report(self) -> str:
+        average = self.total_iterations / self.moves if self.moves else 0
+        kept = self.reused_visits / self.reused if self.reused else 0
+        return f"MCTS: {self.moves} moves, {average:.1f} iterations per move, {self.reused} reused trees ({kept:.1f} visits kept on average)"
+
+def _search_worker(results: multiprocessing.Queue, agent: MCTSAgent, game: Game[S, A], root: MCTSNode[S, A], actions: List[A], iterations: int, seed: int):
+    count = agent.search(game, root, iterations, seed)
+    stats = [(root.children[action].visits, root.children[action].total) if action in root.children else (0, 0) for action in actions]
+    results.put((count, stats))
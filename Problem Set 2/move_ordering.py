@@ -0,0 +1,74 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# This file contains cheap move ordering heuristics for alpha-beta search
+# Ordering the actions by the heuristic value of their successors (as in alphabeta_with_move_ordering) requires building
+# every successor and evaluating the heuristic on it before searching the first child, which can cost more than the pruning saves.
+# Instead, these heuristics order the actions using what the search learned about the actions themselves:
+# - Killer moves: the last actions that caused a cutoff at the same ply (distance from the root). The sibling nodes
+#   are often similar, so an action that refuted one of them is likely to refute the others.
+# - History table: a score for each (agent, action) pair which is increased whenever the action causes a cutoff,
+#   weighted by the remaining depth since a cutoff near the root prunes a bigger subtree.
+# Both are a few dictionary lookups per node, and the heuristic value of the successors is only used (optionally) to break ties.
+
+# The number of killer moves kept for each ply
+KILLER_SLOTS = 2
+
+class MoveOrdering:
+    killers: Dict[int, List[Any]]               # ply -> the last actions that caused a cutoff (the most recent first)
+    history: Dict[Tuple[int, Any], float]       # (agent, action) -> the cutoff score
+    # Statistics
+    cutoffs: int            # The number of recorded cutoffs
+    first_cutoffs: int      # The number of cutoffs caused by the first searched action
+    tie_breaks: int         # The number of heuristic evaluations used to break ties
+
+    def __init__(self) -> None:
+        self.killers = {}
+        self.history = {}
+        self.cutoffs = self.first_cutoffs = self.tie_breaks = 0
+
+    # Prepares for a new search: the killers belong to the plies of the previous search so they are cleared,
+    # while the history is kept but halved so the recent cutoffs matter more than the old ones
+    def new_search(self):
+        self.killers.clear()
+        for key in self.history:
+            self.history[key] /= 2
+
+    # Returns the actions ordered by: the killers of this ply, then the history score (the highest first), then the original order
+    # If "tie_breaker" is given, it is called with the action to compute a score (the highest first) for the actions that have the same history score
+    def order(self, actions: List[Any], agent: int, ply: int, tie_breaker: Optional[Callable[[Any], float]] = None) -> List[Any]:
+        killers = self.killers.get(ply, ())
+        history = self.history
+        first = [action for action in killers if action in actions]
+        rest = [action for action in actions if action not in first]
+        rest.sort(key=lambda action: history.get((agent, action), 0), reverse=True)
+        if tie_breaker is not None and len(rest) > 1:
+            # Sort each run of actions with the same history score by the tie breaker
+            ordered, start = [], 0
+            while start < len(rest):
+                score = history.get((agent, rest[start]), 0)
+                end = start + 1
+                while end < len(rest) and history.get((agent, rest[end]), 0) == score: end += 1
+                run = rest[start:end]
+                if len(run) > 1:
+                    self.tie_breaks += len(run)
+                    run.sort(key=tie_breaker, reverse=True)
+                ordered.extend(run)
+                start = end
+            rest = ordered
+        return first + rest
+
+    # Records that the action caused a cutoff at the given ply with the given remaining depth
+    def record_cutoff(self, action: Any, agent: int, ply: int, depth: int, first: bool):
+        self.cutoffs += 1
+        if first: self.first_cutoffs += 1
+        killers = self.killers.setdefault(ply, [])
+        if action in killers: killers.remove(action)
+        killers.insert(0, action)
+        del killers[KILLER_SLOTS:]
+        key = (agent, action)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    # Returns a human readable summary of the statistics
+    def report(self) -> str:
+        rate = self.first_cutoffs / self.cutoffs if self.cutoffs else 0
+        return f"Move ordering: {self.cutoffs} cutoffs ({100 * rate:.1f}% by the first action), {self.tie_breaks} tie-break evaluations"
@@ -0,0 +1,126 @@
+from typing import List, Optional, Tuple
+from game import HeuristicFunction, Game, S, A
+from helpers.utils import Deadline, fetch_tracked_call_count, get_probe_of
+from search import alphabeta_with_transposition_table
+from transposition import TranspositionTable
+from dataclasses import dataclass
+import math, multiprocessing, os
+
+# This file contains a root-parallel alpha-beta search (in the style of Young Brothers Wait)
+# Searching the root actions in parallel from the start would waste work: without a bound, every action is searched with
+# the full window and nothing is pruned. So the first (eldest) root action is searched alone to get a bound (alpha at a max root),
+# then the other (younger) actions are searched in parallel by a pool of worker processes with the window (alpha, inf).
+# The workers share the bound through a shared value: each worker reads it when it starts an action,
+# and raises it when an action turns out to be better, so the actions started later are searched with a tighter window.
+# The workers are forked after the eldest action is searched, so they start with a copy of everything the parent process has:
+# the game (with its layout and its caches, e.g. the paths computed by the heuristic) and the transposition table,
+# which are read-only for the workers and shared with the parent (the pages are only copied if they are written to).
+# The actions and the values are sent as indices and floats, so nothing else needs to be pickled.
+# The root value is the same as the value of alphabeta, and the action is the first action (in the searched order)
+# that reaches this value, which is also the action selected by searching the root actions one after the other.
+# If the deadline expires, the actions whose search was interrupted are ignored (as in the other searches, see search.py),
+# so the result is the best of the actions that were fully searched.
+
+# The state inherited by the forked workers (set by the parent just before creating the pool)
+_game = None
+_heuristic = None
+_children = None
+_max_depth = None
+_deadline = None
+_table = None
+_bound = None       # The shared bound (alpha at a max root, beta at a min root)
+_maximize = None
+
+def _worker_initializer():
+    # The nodes explored by the workers are counted by the probe on "is_terminal" (if the game has one)
+    probe = get_probe_of(type(_game).is_terminal)
+    if probe is not None: probe.enable()
+    # Clear the node count inherited from the parent so each task only reports its own nodes
+    fetch_tracked_call_count(type(_game).is_terminal)
+
+# The statistics of the parallel search (they are added up over all the searches that receive the same object)
+@dataclass()
+class ParallelStats:
+    worker_nodes: int = 0   # The number of nodes explored by the workers (the nodes explored by this process are counted as usual)
+    researches: int = 0     # The number of actions that had to be searched again because their value was a bound equal to the best value
+
+# Searches the root action with the given index and returns (index, value, whether the value is exact, the number of explored nodes, whether it timed out)
+def _search_action(index: int) -> Tuple[int, float, bool, int, bool]:
+    maximize = _maximize
+    with _bound.get_lock():
+        bound = _bound.value
+    alpha, beta = (bound, math.inf) if maximize else (-math.inf, bound)
+    value, _ = alphabeta_with_transposition_table(_game, _children[index], _heuristic, _max_depth - 1, _deadline, _table, alpha, beta)
+    # A value that does not improve on the bound is only a bound on the true value of the action
+    exact = value > alpha if maximize else value < beta
+    timed_out = _deadline is not None and _deadline.timed_out
+    # The value of an interrupted search is not a bound on the true value, so it must not tighten the window of the other workers
+    if not timed_out:
+        with _bound.get_lock():
+            if (value > _bound.value) if maximize else (value < _bound.value):
+                _bound.value = value
+    return index, value, exact, fetch_tracked_call_count(type(_game).is_terminal), timed_out
+
+# Apply Alpha Beta pruning with the root actions searched in parallel and return the tree value and the best action
+# The root actions are ordered by the heuristic value of their successors (as in alphabeta_with_move_ordering), and each one
+# is searched with a transposition table (see alphabeta_with_transposition_table), so the game must implement "get_hash".
+# "workers" is the number of worker processes (by default, the number of CPUs). With one worker, the actions are searched one after the other.
+# If a "stats" object is given, the number of nodes explored by the workers and the number of re-searched actions are added to it.
+# Hint: Read the hint for minimax.
+def parallel_alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, workers: Optional[int] = None, stats: Optional[ParallelStats] = None) -> Tuple[float, A]:
+    global _game, _heuristic, _children, _max_depth, _deadline, _table, _bound, _maximize
+    if stats is None: stats = ParallelStats()
+    terminal, values = game.is_terminal(state)
+    if terminal: return values[0], None
+    if max_depth == 0: return heuristic(game, state, 0), None
+    agent = game.get_turn(state)
+    maximize = agent == 0
+    # Order the actions so the eldest action is likely to be the best one (which gives the tightest bound to the younger actions)
+    actions_states = [(action, game.get_successor(state, action)) for action in game.get_actions(state)]
+    actions_states.sort(key=lambda x: heuristic(game, x[1], agent), reverse=True)
+    actions: List[A] = [action for action, _ in actions_states]
+    children: List[S] = [child for _, child in actions_states]
+    table = TranspositionTable()
+    values: List[float] = [None] * len(children)
+    exact: List[bool] = [False] * len(children)
+    # Search the eldest action alone with the full window
+    values[0], _ = alphabeta_with_transposition_table(game, children[0], heuristic, max_depth - 1, deadline, table)
+    if deadline is not None and deadline.timed_out: return (-math.inf if maximize else math.inf), None
+    exact[0] = True
+    if workers is None: workers = os.cpu_count() or 1
+    if len(children) > 1 and workers > 1:
+        context = multiprocessing.get_context("fork")
+        bound = context.Value('d', values[0])
+        _game, _heuristic, _children, _max_depth, _deadline, _table, _bound, _maximize = game, heuristic, children, max_depth, deadline, table, bound, maximize
+        try:
+            with context.Pool(min(workers, len(children) - 1), initializer=_worker_initializer) as pool:
+                for index, value, is_exact, nodes, timed_out in pool.imap_unordered(_search_action, range(1, len(children))):
+                    stats.worker_nodes += nodes
+                    if timed_out:
+                        deadline.timed_out = True
+                        continue
+                    values[index], exact[index] = value, is_exact
+        finally:
+            _game = _heuristic = _children = _max_depth = _deadline = _table = _bound = _maximize = None
+    else:
+        best = values[0]
+        for index in range(1, len(children)):
+            alpha, beta = (best, math.inf) if maximize else (-math.inf, best)
+            value, _ = alphabeta_with_transposition_table(game, children[index], heuristic, max_depth - 1, deadline, table, alpha, beta)
+            if deadline is not None and deadline.timed_out: break
+            values[index] = value
+            exact[index] = values[index] > alpha if maximize else values[index] < beta
+            if exact[index]: best = values[index]
+    # The best value is always exact (the bounds are never better than the value of the action that set them)
+    best = max(value for value, is_exact in zip(values, exact) if is_exact) if maximize else \
+        min(value for value, is_exact in zip(values, exact) if is_exact)
+    for index in range(len(children)):
+        if exact[index]:
+            if values[index] == best: return best, actions[index]
+        elif values[index] == best and (deadline is None or not deadline.timed_out):
+            # The bound is equal to the best value, so the true value of the action may also be the best value.
+            # We search it again with a window just below the best value to tell whether it reaches it.
+            stats.researches += 1
+            alpha, beta = (math.nextafter(best, -math.inf), math.inf) if maximize else (-math.inf, math.nextafter(best, math.inf))
+            value, _ = alphabeta_with_transposition_table(game, children[index], heuristic, max_depth - 1, deadline, table, alpha, beta)
+            if value == best and (deadline is None or not deadline.timed_out): return best, actions[index]
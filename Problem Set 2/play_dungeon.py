@@ -1,6 +1,8 @@
-from dungeon import DungeonGame, Direction, DungeonState, DungeonTile, MonsterAgent
+from typing import Dict, List
+from dungeon import DungeonGame, Direction, DungeonLayout, DungeonState, DungeonTile, MonsterAgent
+from mathutils import Point
 from agents import HumanAgent, SearchAgent, RandomAgent
-from helpers.utils import fetch_tracked_call_count
+from helpers.utils import fetch_tracked_call_count, set_probes_enabled
 import argparse, time
 
 def colored_dungeon(level: str):
@@ -16,6 +18,47 @@ def colored_dungeon(level: str):
     level = level.replace(DungeonTile.DAGGER, f'{bcolors.BRIGHT_GREEN}{DungeonTile.DAGGER}{bcolors.ENDC}')
     return f"{header}\n{level}"
 
+# The colors used by the incremental renderer (the same as colored_dungeon)
+def dungeon_colors():
+    from helpers.utils import bcolors
+    return {
+        DungeonTile.COIN.value: bcolors.BRIGHT_GREEN,
+        DungeonTile.PLAYER.value: bcolors.YELLOW,
+        DungeonTile.WALL.value: bcolors.BRIGHT_BLACK,
+        DungeonTile.EMPTY.value: bcolors.BRIGHT_BLACK,
+        DungeonTile.KEY.value: bcolors.BLUE,
+        DungeonTile.EXIT.value: bcolors.BRIGHT_BLUE,
+        DungeonTile.MONSTER.value: bcolors.BRIGHT_RED,
+        DungeonTile.DAGGER.value: bcolors.BRIGHT_GREEN,
+    }
+
+# Returns the rows of the parts of the map that never change (the walls, the floor and the exit)
+def dungeon_static_rows(layout: DungeonLayout) -> List[str]:
+    def static_tile(position: Point) -> str:
+        if position not in layout.walkable: return DungeonTile.WALL.value
+        if position == layout.exit: return DungeonTile.EXIT.value
+        return DungeonTile.EMPTY.value
+    return [''.join(static_tile(Point(x, y)) for x in range(layout.width)) for y in range(layout.height)]
+
+# Returns the cells that change across states drawn on top of the static rows
+# They are added from the lowest to the highest priority so they overlap in the same order as in "DungeonState.__str__"
+def dungeon_dynamic_cells(state: DungeonState) -> Dict[tuple, str]:
+    cells = {}
+    for items, tile in ((state.daggers, DungeonTile.DAGGER), (state.coins, DungeonTile.COIN), (state.keys, DungeonTile.KEY)):
+        for item in items:
+            if item != state.layout.exit: # The exit is drawn above the items
+                cells[(item.x, item.y)] = tile.value
+    for monster in state.monsters:
+        if monster.alive:
+            cells[(monster.position.x, monster.position.y)] = DungeonTile.MONSTER.value
+    cells[(state.player.position.x, state.player.position.y)] = DungeonTile.PLAYER.value
+    return cells
+
+# Returns the header drawn above the map (the same as the first line of "DungeonState.__str__")
+def dungeon_header(state: DungeonState) -> str:
+    inventory = state.player.inventory
+    return f"Inventory: {inventory.keys} Key(s), {inventory.daggers} Dagger(s), {inventory.coins} Coin(s)"
+
 # Return the heuristic selected by the user
 def get_heuristic(name: str):
     if name == "zero":
@@ -52,23 +95,95 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "greedy":
         from search import greedy
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(greedy, heuristic, -1)
+        return SearchAgent(greedy, heuristic, -1, args.time_limit or None)
     if agent_type == "minimax":
         from search import minimax
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(minimax, heuristic, args.depth)
+        return SearchAgent(minimax, heuristic, args.depth, args.time_limit or None)
     if agent_type == "alphabeta":
         from search import alphabeta
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(alphabeta, heuristic, args.depth)
+        return SearchAgent(alphabeta, heuristic, args.depth, args.time_limit or None)
     if agent_type == "alphabeta_order":
         from search import alphabeta_with_move_ordering
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(alphabeta_with_move_ordering, heuristic, args.depth)
+        return SearchAgent(alphabeta_with_move_ordering, heuristic, args.depth, args.time_limit or None)
+    if agent_type == "alphabeta_killer":
+        from search import alphabeta_with_killer_moves
+        from move_ordering import MoveOrdering
+        from functools import partial
+        heuristic = get_heuristic(args.heuristic)
+        # The history is shared by all the moves and kept on the agent to report its statistics at the end
+        ordering = MoveOrdering()
+        agent = SearchAgent(partial(alphabeta_with_killer_moves, ordering=ordering, tie_breaker=args.tie_breaker), heuristic, args.depth, args.time_limit or None)
+        agent.ordering = ordering
+        return agent
+    if agent_type == "alphabeta_tt":
+        from search import alphabeta_with_transposition_table
+        from transposition import TranspositionTable
+        from functools import partial
+        heuristic = get_heuristic(args.heuristic)
+        # The table is shared by all the moves and kept on the agent to report its statistics at the end
+        table = TranspositionTable(args.table_size)
+        agent = SearchAgent(partial(alphabeta_with_transposition_table, table=table), heuristic, args.depth, args.time_limit or None)
+        agent.table = table
+        return agent
+    if agent_type in ("alphabeta_id", "pvs"):
+        from search import iterative_deepening_alphabeta, DepthStats, ASPIRATION_WINDOW
+        from transposition import TranspositionTable
+        heuristic = get_heuristic(args.heuristic)
+        if not args.time_limit and args.depth < 0:
+            print(f"The '{agent_type}' agent needs a time limit (--time-limit) or a maximum depth (--depth)")
+            exit(-1)
+        table = TranspositionTable(args.table_size)
+        # The 'pvs' agent adds the null windows and the aspiration windows to the iterative deepening
+        options = dict(principal_variation=True, window=ASPIRATION_WINDOW) if agent_type == "pvs" else {}
+        depths: List[int] = []
+        # Record the depth completed at each move to report it at the end
+        def search_fn(*search_args, **search_kwargs):
+            stats = DepthStats()
+            result = iterative_deepening_alphabeta(*search_args, table=table, stats=stats, **options, **search_kwargs)
+            depths.append(stats.completed_depth)
+            return result
+        agent = SearchAgent(search_fn, heuristic, args.depth, args.time_limit or None)
+        agent.table, agent.depths = table, depths
+        return agent
+    if agent_type == "alphabeta_parallel":
+        from parallel_search import parallel_alphabeta
+        from functools import partial
+        heuristic = get_heuristic(args.heuristic)
+        return SearchAgent(partial(parallel_alphabeta, workers=args.workers or None), heuristic, args.depth, args.time_limit or None)
     if agent_type == "expectimax":
         from search import expectimax
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(expectimax, heuristic, args.depth)
+        return SearchAgent(expectimax, heuristic, args.depth, args.time_limit or None)
+    if agent_type == "expectimax_pruned":
+        from search import expectimax_with_pruning
+        heuristic = get_heuristic(args.heuristic)
+        return SearchAgent(expectimax_with_pruning, heuristic, args.depth, args.time_limit or None)
+    if agent_type == "expectimax_sparse":
+        from search import sparse_expectimax
+        from functools import partial
+        heuristic = get_heuristic(args.heuristic)
+        # A sample count of 0 means that all the outcomes are averaged (only the memoisation is used)
+        return SearchAgent(partial(sparse_expectimax, samples=args.samples or None), heuristic, args.depth, args.time_limit or None)
+    if agent_type == "minimax_inplace":
+        from search import minimax_in_place
+        heuristic = get_heuristic(args.heuristic)
+        return SearchAgent(minimax_in_place, heuristic, args.depth, args.time_limit or None)
+    if agent_type == "alphabeta_inplace":
+        from search import alphabeta_in_place
+        heuristic = get_heuristic(args.heuristic)
+        return SearchAgent(alphabeta_in_place, heuristic, args.depth, args.time_limit or None)
+    if agent_type == "expectimax_inplace":
+        from search import expectimax_in_place
+        heuristic = get_heuristic(args.heuristic)
+        return SearchAgent(expectimax_in_place, heuristic, args.depth, args.time_limit or None)
+    if agent_type == "mcts":
+        from mcts import MCTSAgent
+        heuristic = get_heuristic(args.heuristic)
+        # The heuristic evaluates the states where the rollouts are cut short, and the time limit (if any) replaces the iteration budget
+        return MCTSAgent(heuristic, args.mcts_iterations, args.time_limit or None, rollout_depth=args.mcts_rollout_depth, workers=args.mcts_workers)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -77,15 +192,28 @@ def main(args: argparse.Namespace):
     if args.ansicolors: state_printer = lambda state: print(colored_dungeon(str(state)))
 
     start = time.time() # Track run time
+    set_probes_enabled(True, "DungeonGame.is_terminal") # The explored nodes are counted by the probe on "is_terminal"
     game = DungeonGame.from_file(args.level) # create the game
     state = game.get_initial_state() # Get the initial state
-    print("Initial State:")
-    state_printer(state)
+    if args.distances:
+        # If desired by the user, the shortest path tables of the heuristic are loaded from a file (or computed and saved to it)
+        from dungeon import load_distance_table
+        load_distance_table(game, args.distances)
+    renderer = None
+    if args.diff and not args.headless:
+        # If desired by the user, only the cells that changed are redrawn at each step
+        from renderer import DiffRenderer
+        renderer = DiffRenderer(dungeon_static_rows(state.layout), dungeon_colors() if args.ansicolors else None, has_header=True)
+        renderer.draw(dungeon_dynamic_cells(state), dungeon_header(state), "Initial State")
+    elif not args.headless:
+        print("Initial State:")
+        state_printer(state)
 
     # create the agents that will play the game
     agents = [create_agent(args), *(MonsterAgent(index) for index in range(game.agent_count - 1))]
     
     step = 0 # This will store the current step
+    agent_time = 0 # This will store the time spent by the agents to choose their actions
     
     while True:
 
@@ -106,24 +234,46 @@ def main(args: argparse.Namespace):
 
         fetch_tracked_call_count(DungeonGame.is_terminal) # Clear the call counter
         
+        turn = game.get_turn(state) # get the current turn
+
         # if this is the turn of the first player, increment the step counter
         if turn == 0: step += 1
 
-        turn = game.get_turn(state) # get the current turn
         agent = agents[turn] # get the agent that will play the current turn
+        act_start = time.time()
         action = agent.act(game, state) # Request an action from the agent
+        agent_time += time.time() - act_start
         
         # Get the number of explored nodes, if the current agent is a search agent
-        if isinstance(agent, SearchAgent):
-            print("Explored Nodes:", fetch_tracked_call_count(DungeonGame.is_terminal))
+        explored = fetch_tracked_call_count(DungeonGame.is_terminal) if isinstance(agent, SearchAgent) else None
+        if explored is not None and renderer is None and not args.headless:
+            print("Explored Nodes:", explored, "(timed out)" if agent.timed_out else "")
         
         # Apply the action to the state
         state = game.get_successor(state, action)
         
         # Print any useful information to the user
-        print("Step:", step, "/ Turn:", turn, "/ Action:", str(action))
-        state_printer(state)
+        if renderer is not None:
+            status = f"Step: {step} / Turn: {turn} / Action: {action}"
+            if explored is not None: status += f" / Explored Nodes: {explored}"
+            renderer.draw(dungeon_dynamic_cells(state), dungeon_header(state), status)
+        elif not args.headless:
+            print("Step:", step, "/ Turn:", turn, "/ Action:", str(action))
+            state_printer(state)
     
+    if args.headless or renderer is not None:
+        print(f"Agent time: {agent_time} seconds over {step} step(s)")
+    table = getattr(agents[0], "table", None)
+    if table is not None:
+        print(table.report())
+    ordering = getattr(agents[0], "ordering", None)
+    if ordering is not None:
+        print(ordering.report())
+    depths = getattr(agents[0], "depths", None)
+    if depths:
+        print(f"Completed depths: min {min(depths)}, max {max(depths)}, average {sum(depths) / len(depths):.2f}")
+    if hasattr(agents[0], "total_iterations"):
+        print(agents[0].report())
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -133,14 +283,37 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Dungeon as Human or AI")
     parser.add_argument("level", help="path to the dungeon to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'greedy', 'random', 'minimax', 'alphabeta', 'alphabeta_order', 'expectimax'],
+                        choices=['human', 'greedy', 'random', 'minimax', 'alphabeta', 'alphabeta_order', 'alphabeta_killer', 'alphabeta_tt', 'alphabeta_id', 'pvs', 'alphabeta_parallel', 'expectimax', 'expectimax_pruned', 'expectimax_sparse',
+                                 'minimax_inplace', 'alphabeta_inplace', 'expectimax_inplace', 'mcts'],
                         help="the agent that will play the game")
     parser.add_argument("--heuristic", '-hf', default="zero",
                         choices=["zero", "heuristic"],
                         help="choose the heuristic to use")
     parser.add_argument("--depth", "-d", type=int, default=5, help="How deep the algorithms should search")
+    parser.add_argument("--tie-breaker", action="store_true",
+                        help="Let the 'alphabeta_killer' agent break the ordering ties with the heuristic")
+    parser.add_argument("--samples", type=int, default=3,
+                        help="The number of outcomes sampled at each chance node by the 'expectimax_sparse' agent (0 means all)")
+    parser.add_argument("--table-size", type=int, default=1<<16,
+                        help="The number of slots in the transposition table of the 'alphabeta_tt', 'alphabeta_id' and 'pvs' agents")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="The number of worker processes of the 'alphabeta_parallel' agent (0 means the number of CPUs)")
+    parser.add_argument("--mcts-iterations", type=int, default=1000,
+                        help="The number of iterations per move of the 'mcts' agent (ignored if there is a time limit)")
+    parser.add_argument("--mcts-rollout-depth", type=int, default=40,
+                        help="The maximum number of actions in a rollout of the 'mcts' agent (-1 means until the game ends)")
+    parser.add_argument("--mcts-workers", type=int, default=1,
+                        help="The number of processes searching in parallel for the 'mcts' agent")
+    parser.add_argument("--distances", default="",
+                        help="A file to load the shortest path tables of the heuristic from (they are computed and saved to it if it does not exist)")
+    parser.add_argument("--time-limit", "-tl", type=float, default=0,
+                        help="The time (seconds) given to each search before it is cut short (0 means no limit)")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
                         help="Print the dungeon on the console with ANSI colors (only works on some terminals)")
+    parser.add_argument("--diff", action="store_true",
+                        help="Draw the dungeon once then only redraw the cells that change (uses ANSI cursor moves)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Do not draw the dungeon at all and only report the timings")
     parser.add_argument("--sleep", "-s", type=float, default=0, help="How much time (seconds) to wait between actions")
 
     args = parser.parse_args()
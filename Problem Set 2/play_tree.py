@@ -1,7 +1,7 @@
 import time
 from tree import TreeGame, TreeNode, tree_heuristic
 from agents import HumanAgent, SearchAgent, RandomAgent
-from helpers.utils import fetch_recorded_calls
+from helpers.utils import fetch_recorded_calls, set_probes_enabled
 from helpers.pruned_tree import pruned_tree_string
 from helpers.mt19937 import RandomGenerator
 import argparse
@@ -54,6 +54,7 @@ def create_agent(agent_type: str, heuristic_type: str):
 
 def main(args: argparse.Namespace):
     start = time.time() # Track run time
+    set_probes_enabled(True, "TreeGame.is_terminal") # The explored nodes are recorded by the probe on "is_terminal"
     game = TreeGame.from_file(args.tree) # create the problem
     
     # Get the initial state
@@ -0,0 +1,73 @@
+from typing import Dict, List, Optional, TextIO, Tuple
+from helpers.utils import bcolors
+import sys
+
+# This file contains an incremental terminal renderer for grid games
+# The static part of the map (walls, floor, exit) is drawn once, then each frame only redraws the cells that changed
+# (e.g. the player, the coins and the monsters) using relative ANSI cursor moves, instead of printing the whole map again.
+# The frame is made of an optional header line, the map and a status line, and the cursor always rests below the status line.
+# Since the moves are relative, the whole frame must fit in the terminal and nothing else should be printed while it is used.
+
+Cell = Tuple[int, int]
+
+class DiffRenderer:
+    static: List[str]                       # The rows of the map without the dynamic cells
+    colors: Optional[Dict[str, str]]        # The ANSI color of each tile (or None to print without colors)
+    stream: TextIO
+    has_header: bool
+    cells: Optional[Dict[Cell, str]]        # The dynamic cells drawn in the last frame (None before the first frame)
+    redrawn: int                            # The total number of redrawn cells (after the first frame)
+    tiles: Dict[str, str]                   # The cached (colored) text of each tile
+
+    def __init__(self, static: List[str], colors: Optional[Dict[str, str]] = None, has_header: bool = False, stream: TextIO = sys.stdout) -> None:
+        self.static = static
+        self.colors = colors
+        self.stream = stream
+        self.has_header = has_header
+        self.cells = None
+        self.redrawn = 0
+        self.tiles = {}
+
+    # Returns the text of a tile, the colors are applied once per tile so each redrawn cell is a dictionary lookup
+    def tile(self, char: str) -> str:
+        text = self.tiles.get(char)
+        if text is None:
+            color = None if self.colors is None else self.colors.get(char)
+            text = char if color is None else f"{color}{char}{bcolors.ENDC}"
+            self.tiles[char] = text
+        return text
+
+    # Draws a frame where "cells" maps each dynamic cell (x, y) to its tile
+    def draw(self, cells: Dict[Cell, str], header: str = "", status: str = ""):
+        if self.cells is None:
+            self._draw_full(cells, header, status)
+        else:
+            self._draw_diff(cells, header, status)
+        self.cells = dict(cells)
+        self.stream.flush()
+
+    def _draw_full(self, cells: Dict[Cell, str], header: str, status: str):
+        lines = [header] if self.has_header else []
+        for y, row in enumerate(self.static):
+            lines.append(''.join(self.tile(cells.get((x, y), char)) for x, char in enumerate(row)))
+        lines.append(status)
+        self.stream.write('\n'.join(lines) + '\n')
+
+    def _draw_diff(self, cells: Dict[Cell, str], header: str, status: str):
+        height = len(self.static)
+        parts = []
+        # The number of lines between the cursor and each map row is (height + 1 - y) since the status line comes last
+        for position in self.cells.keys() | cells.keys():
+            char = cells.get(position)
+            if char == self.cells.get(position): continue
+            x, y = position
+            if char is None: char = self.static[y][x]
+            up = height + 1 - y
+            right = f"\033[{x}C" if x > 0 else "" # A move of 0 columns is treated as 1 by most terminals
+            parts.append(f"\033[{up}A\r{right}{self.tile(char)}\033[{up}B\r")
+            self.redrawn += 1
+        if self.has_header:
+            up = height + 2
+            parts.append(f"\033[{up}A\r{header}\033[K\033[{up}B\r")
+        parts.append(f"\033[1A\r{status}\033[K\n")
+        self.stream.write(''.join(parts))
@@ -1,18 +1,27 @@
-from typing import Tuple
+from typing import Dict, Hashable, List, Optional, Tuple
 from game import HeuristicFunction, Game, S, A
-from helpers.utils import NotImplemented
+from helpers.utils import NotImplemented, Deadline
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, UNLIMITED_DEPTH
+from move_ordering import MoveOrdering
+from helpers.mt19937 import RandomGenerator
+from dataclasses import dataclass
 
 #TODO: Import any modules you want to use
-import math
+import math, time
 
 # All search functions take a problem, a state, a heuristic function and the maximum search depth.
 # If the maximum search depth is -1, then there should be no depth cutoff (The expansion should not stop before reaching a terminal state) 
 
 # All the search functions should return the expected tree value and the best action to take based on the search results
 
+# All the search functions also accept an optional "deadline" (see helpers/utils.py) which is checked once per node.
+# When it expires, every node stops at the child whose search was interrupted and ignores its value (it comes from a cut subtree),
+# so the root returns the best value and action among the actions that were fully searched before the deadline
+# (or no action if the deadline expired during the first one), and "deadline.timed_out" tells that the search did not finish.
+
 # This is a simple search function that looks 1-step ahead and returns the action that lead to highest heuristic value.
 # This algorithm is bad if the heuristic function is weak. That is why we use minimax search to look ahead for many steps.
-def greedy(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+def greedy(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
     agent = game.get_turn(state)
     
     terminal, values = game.is_terminal(state)
@@ -29,20 +38,21 @@ def greedy(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth:
 # and if it is > 0, it should be a min node. Also remember that game.is_terminal(s), returns the values
 # for all the agents. So to get the value for the player (which acts at the max nodes), you need to
 # get values[0].
-def minimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+def minimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
     #COMMENT: Get the current agent (max or min)
     agent = game.get_turn(state)
     terminal, values = game.is_terminal(state)
     #COMMENT: In case of terminal state or max depth return the leaf value or heuristic value and None as action
     if terminal: return values[0], None
-    if max_depth == 0: return heuristic(game, state, 0), None
+    if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, state, 0), None
     #COMMENT: If the current agent is the max agent
     if agent == 0:
         optimal_value = -math.inf
         optimal_action = None
         #COMMENT: For each action in the current state get the successor state and call minimax on the new state
         for action in game.get_actions(state):
-            value, _ = minimax(game, game.get_successor(state, action), heuristic, max_depth - 1)
+            value, _ = minimax(game, game.get_successor(state, action), heuristic, max_depth - 1, deadline)
+            if deadline is not None and deadline.timed_out: break
             #COMMENT: Update the optimal value and action in case of a bigger value found
             if value > optimal_value:
                 optimal_value = value
@@ -54,7 +64,8 @@ def minimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth:
         optimal_action = None
         #COMMENT: For each action in the current state get the successor state and call minimax on the new state
         for action in game.get_actions(state):
-            value, _ = minimax(game, game.get_successor(state, action), heuristic, max_depth - 1)
+            value, _ = minimax(game, game.get_successor(state, action), heuristic, max_depth - 1, deadline)
+            if deadline is not None and deadline.timed_out: break
             #COMMENT: Update the optimal value and action in case of a smaller value found
             if value < optimal_value:
                 optimal_value = value
@@ -63,7 +74,7 @@ def minimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth:
 
 # Apply Alpha Beta pruning and return the tree value and the best action
 # Hint: Read the hint for minimax.
-def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
     #COMMENT: define a funtion for recursive backtracking
     def alphabeta_backtrack(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int, alpha: float, beta: float) -> Tuple[float, A]:
         #COMMENT: Get the current agent (max or min)
@@ -71,7 +82,7 @@ def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_dept
         terminal, values = game.is_terminal(state)
         #COMMENT: In case of terminal state or max depth return the leaf value or heuristic value and None as action
         if terminal: return values[0], None
-        if max_depth == 0: return heuristic(game, state, 0), None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, state, 0), None
         #COMMENT: If the current agent is the max agent
         if agent == 0:
             optimal_value = -math.inf
@@ -79,6 +90,7 @@ def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_dept
             #COMMENT: For each action in the current state get the successor state and call alphabeta on the new state
             for action in game.get_actions(state):
                 value, _ = alphabeta_backtrack(game, game.get_successor(state, action), heuristic, max_depth - 1, alpha, beta)
+                if deadline is not None and deadline.timed_out: break
                 if value > optimal_value:
                     optimal_value = value
                     optimal_action = action
@@ -95,6 +107,7 @@ def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_dept
             #COMMENT: For each action in the current state get the successor state and call alphabeta on the new state
             for action in game.get_actions(state):
                 value, _ = alphabeta_backtrack(game, game.get_successor(state, action), heuristic, max_depth - 1, alpha, beta)
+                if deadline is not None and deadline.timed_out: break
                 if value < optimal_value:
                     optimal_value = value
                     optimal_action = action
@@ -109,7 +122,7 @@ def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_dept
 
 # Apply Alpha Beta pruning with move ordering and return the tree value and the best action
 # Hint: Read the hint for minimax.
-def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
     #COMMENT: define a funtion for recursive backtracking
     def alphabeta_with_move_ordering_backtrack(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int, alpha: float, beta: float) -> Tuple[float, A]:
         #COMMENT: Get the current agent (max or min)
@@ -117,7 +130,7 @@ def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: Heuristi
         terminal, values = game.is_terminal(state)
         #COMMENT: In case of terminal state or max depth return the leaf value or heuristic value and None as action
         if terminal: return values[0], None
-        if max_depth == 0: return heuristic(game, state, 0), None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, state, 0), None
         #COMMENT: Now we are going to sort the actions based on the heuristic value of the successor state
         actions_states = [(action, game.get_successor(state, action)) for action in game.get_actions(state)]
         actions_states.sort(key=lambda x: heuristic(game, x[1], agent), reverse=True)
@@ -128,6 +141,7 @@ def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: Heuristi
             #COMMENT: loop over the ordered actions and states and call alphabeta on the new state
             for action, state in actions_states:
                 value, _ = alphabeta_with_move_ordering_backtrack(game, state, heuristic, max_depth - 1, alpha, beta)
+                if deadline is not None and deadline.timed_out: break
                 if value > optimal_value:
                     optimal_value = value
                     optimal_action = action 
@@ -144,6 +158,7 @@ def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: Heuristi
             #COMMENT: loop over the ordered actions and states and call alphabeta on the new state
             for action, state in actions_states:
                 value, _ = alphabeta_with_move_ordering_backtrack(game, state, heuristic, max_depth - 1, alpha, beta)
+                if deadline is not None and deadline.timed_out: break
                 if value < optimal_value:
                     optimal_value = value
                     optimal_action = action
@@ -156,22 +171,238 @@ def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: Heuristi
     #COMMENT: Call the recursive backtracking function with the initial values
     return alphabeta_with_move_ordering_backtrack(game, state, heuristic, max_depth, -math.inf, math.inf)
 
+# Apply Alpha Beta pruning with the killer moves and the history heuristic (see move_ordering.py) and return the tree value and the best action
+# The actions are ordered without building the successors in advance. If "tie_breaker" is True, the heuristic value of the successors
+# is used to order the actions that have the same history score (so it is only evaluated when the cheap ordering cannot decide).
+# The same ordering object can be given to the searches of consecutive moves to keep the history, otherwise a new one is created.
+# Hint: Read the hint for minimax.
+def alphabeta_with_killer_moves(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, ordering: Optional[MoveOrdering] = None, tie_breaker: bool = False) -> Tuple[float, A]:
+    if ordering is None: ordering = MoveOrdering()
+    ordering.new_search()
+    def alphabeta_with_killer_moves_backtrack(state: S, max_depth: int, ply: int, alpha: float, beta: float) -> Tuple[float, A]:
+        agent = game.get_turn(state)
+        terminal, values = game.is_terminal(state)
+        if terminal: return values[0], None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, state, 0), None
+        #COMMENT: The tie breaker scores an action by the heuristic value of its successor for the current agent
+        tie_break_fn = (lambda action: heuristic(game, game.get_successor(state, action), agent)) if tie_breaker else None
+        actions = ordering.order(game.get_actions(state), agent, ply, tie_break_fn)
+        #COMMENT: The cutoffs are weighted by the remaining depth (a search without a depth cutoff counts every cutoff as 1)
+        depth = max_depth if max_depth > 0 else 1
+        if agent == 0:
+            optimal_value = -math.inf
+            optimal_action = None
+            for index, action in enumerate(actions):
+                value, _ = alphabeta_with_killer_moves_backtrack(game.get_successor(state, action), max_depth - 1, ply + 1, alpha, beta)
+                if deadline is not None and deadline.timed_out: break
+                if value > optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+                alpha = max(alpha, optimal_value)
+                if optimal_value >= beta:
+                    #COMMENT: Remember the action that caused the cutoff to search it first in the similar nodes
+                    ordering.record_cutoff(action, agent, ply, depth, index == 0)
+                    return optimal_value, optimal_action
+            return optimal_value, optimal_action
+        else:
+            optimal_value = math.inf
+            optimal_action = None
+            for index, action in enumerate(actions):
+                value, _ = alphabeta_with_killer_moves_backtrack(game.get_successor(state, action), max_depth - 1, ply + 1, alpha, beta)
+                if deadline is not None and deadline.timed_out: break
+                if value < optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+                beta = min(beta, optimal_value)
+                if optimal_value <= alpha:
+                    ordering.record_cutoff(action, agent, ply, depth, index == 0)
+                    return optimal_value, optimal_action
+            return optimal_value, optimal_action
+    return alphabeta_with_killer_moves_backtrack(state, max_depth, 0, -math.inf, math.inf)
+
+# The statistics of the searches with a transposition table (they describe the last search that received the object)
+@dataclass()
+class DepthStats:
+    reached_horizon: bool = False #COMMENT: Whether the result depends on the depth cutoff
+    completed_depth: int = 0 #COMMENT: The depth of the result returned by the iterative deepening search
+
+# Apply Alpha Beta pruning with a transposition table (see transposition.py) and return the tree value and the best action
+# The game must implement "get_hash". The same table can be given to the searches of consecutive moves to reuse their results
+# (and to read its statistics), otherwise a new table is created for this search.
+# With a new table, it returns the same value as alphabeta. With a table shared with earlier searches, an entry stored by a deeper search
+# is reused at a shallower remaining depth, so the value can come from a deeper search and differ from the value of alphabeta at "max_depth".
+# If a "stats" object is given, its "reached_horizon" tells after the search whether the result depends on the depth cutoff
+# (if it is False, every path ended in a terminal state, so searching deeper would return the same value).
+# The root window can be narrowed with "alpha" and "beta". If the true value is outside the window, the returned value is a bound:
+# at most alpha if the search fails low and at least beta if it fails high.
+# If "principal_variation" is True, it applies Principal Variation Search (see principal_variation_search).
+# Hint: Read the hint for minimax.
+def alphabeta_with_transposition_table(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, table: Optional[TranspositionTable] = None,
+                                       alpha: float = -math.inf, beta: float = math.inf, principal_variation: bool = False, stats: Optional[DepthStats] = None) -> Tuple[float, A]:
+    if table is None: table = TranspositionTable()
+    table.new_search()
+    #COMMENT: Count the nodes evaluated by the heuristic (or answered by a depth-limited entry) instead of being searched to the end
+    horizon = 0
+    def alphabeta_with_transposition_table_backtrack(state: S, max_depth: int, alpha: float, beta: float) -> Tuple[float, A]:
+        nonlocal horizon
+        agent = game.get_turn(state)
+        terminal, values = game.is_terminal(state)
+        if terminal: return values[0], None
+        if max_depth == 0 or (deadline is not None and deadline.tick()):
+            horizon += 1
+            return heuristic(game, state, 0), None
+        #COMMENT: A negative depth means that there is no depth cutoff, so the stored result is valid for any depth
+        depth = max_depth if max_depth > 0 else UNLIMITED_DEPTH
+        key = game.get_hash(state)
+        entry = table.lookup(key)
+        actions = game.get_actions(state)
+        if entry is not None:
+            #COMMENT: If the stored search was deep enough and its value is exact (or a bound outside the window), we reuse it
+            if entry.depth >= depth and (entry.bound == EXACT or (entry.bound == LOWER and entry.value >= beta) or (entry.bound == UPPER and entry.value <= alpha)):
+                table.cutoffs += 1
+                if entry.depth != UNLIMITED_DEPTH: horizon += 1
+                return entry.value, entry.move
+            #COMMENT: Otherwise, we search the stored best action first since it is likely to cause a cutoff
+            if entry.move is not None and entry.move in actions:
+                actions = [entry.move] + [action for action in actions if action != entry.move]
+        original_alpha, original_beta, original_horizon = alpha, beta, horizon
+        if agent == 0:
+            optimal_value = -math.inf
+            optimal_action = None
+            for index, action in enumerate(actions):
+                child = game.get_successor(state, action)
+                if index == 0 or not principal_variation:
+                    value, _ = alphabeta_with_transposition_table_backtrack(child, max_depth - 1, alpha, beta)
+                else:
+                    #COMMENT: Test whether the action is better than alpha with a null window
+                    value, _ = alphabeta_with_transposition_table_backtrack(child, max_depth - 1, alpha, math.nextafter(alpha, math.inf))
+                    #COMMENT: If it is better (but not enough to prune), its value is at least "value", so we search it again
+                    #COMMENT: with the window (value, beta) to get its exact value. If that search fails low, the value was exact.
+                    if alpha < value < beta:
+                        lower_bound = value
+                        value, _ = alphabeta_with_transposition_table_backtrack(child, max_depth - 1, lower_bound, beta)
+                        value = max(value, lower_bound)
+                if deadline is not None and deadline.timed_out: break
+                if value > optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+                alpha = max(alpha, optimal_value)
+                if optimal_value >= beta: break
+        else:
+            optimal_value = math.inf
+            optimal_action = None
+            for index, action in enumerate(actions):
+                child = game.get_successor(state, action)
+                if index == 0 or not principal_variation:
+                    value, _ = alphabeta_with_transposition_table_backtrack(child, max_depth - 1, alpha, beta)
+                else:
+                    #COMMENT: Test whether the action is better (smaller) than beta with a null window
+                    value, _ = alphabeta_with_transposition_table_backtrack(child, max_depth - 1, math.nextafter(beta, -math.inf), beta)
+                    if alpha < value < beta:
+                        upper_bound = value
+                        value, _ = alphabeta_with_transposition_table_backtrack(child, max_depth - 1, alpha, upper_bound)
+                        value = min(value, upper_bound)
+                if deadline is not None and deadline.timed_out: break
+                if value < optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+                beta = min(beta, optimal_value)
+                if optimal_value <= alpha: break
+        #COMMENT: The results computed after the deadline are not stored since their subtrees were cut short
+        if deadline is None or not deadline.timed_out:
+            #COMMENT: A value outside the original window is only a bound on the true value because some actions were pruned
+            if optimal_value <= original_alpha: bound = UPPER
+            elif optimal_value >= original_beta: bound = LOWER
+            else: bound = EXACT
+            #COMMENT: If no node below this one reached the horizon, the result holds for any depth
+            if horizon == original_horizon: depth = UNLIMITED_DEPTH
+            table.store(key, depth, bound, optimal_value, optimal_action)
+        return optimal_value, optimal_action
+    result = alphabeta_with_transposition_table_backtrack(state, max_depth, alpha, beta)
+    if stats is not None: stats.reached_horizon = horizon != 0
+    return result
+
+# Apply Alpha Beta pruning with iterative deepening and return the value and the best action of the deepest completed search
+# It searches to depth 1, 2, 3, ... (until "max_depth" if it is not -1) and stops when the deadline expires,
+# so the time spent on each move is bounded by the deadline while the search still goes as deep as the time allows.
+# All the iterations share a transposition table, so each iteration searches the best actions of the previous one first.
+# The result of an iteration interrupted by the deadline is discarded (unless no iteration was completed).
+# If a "stats" object is given, its "completed_depth" holds the depth of the returned result after the search.
+# If a "window" is given, each iteration uses an aspiration window (see pvs_with_aspiration_windows).
+# Hint: Read the hint for minimax.
+def iterative_deepening_alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, table: Optional[TranspositionTable] = None,
+                                  principal_variation: bool = False, window: Optional[float] = None, stats: Optional[DepthStats] = None) -> Tuple[float, A]:
+    if table is None: table = TranspositionTable()
+    iteration = DepthStats() #COMMENT: The statistics of the current iteration
+    result, completed_depth, reached_horizon = None, 0, True
+    depth, previous_time = 1, None
+    while max_depth < 0 or depth <= max_depth:
+        start = time.perf_counter()
+        if window is None or result is None:
+            alpha, beta = -math.inf, math.inf
+        else:
+            alpha, beta = result[0] - window, result[0] + window
+        while True:
+            value, action = alphabeta_with_transposition_table(game, state, heuristic, depth, deadline, table, alpha, beta, principal_variation, iteration)
+            if deadline is not None and deadline.timed_out: break
+            #COMMENT: If the search failed low or high, the value is only a bound so we open the window on that side
+            if value <= alpha: alpha = -math.inf
+            elif value >= beta: beta = math.inf
+            else: break
+        if deadline is not None and deadline.timed_out:
+            if result is None: result, completed_depth = (value, action), depth
+            break
+        result, completed_depth, reached_horizon = (value, action), depth, iteration.reached_horizon
+        #COMMENT: If no path reached the horizon, a deeper search would return the same result
+        if not reached_horizon: break
+        #COMMENT: Do not start an iteration that will not finish in time. Its duration is estimated from the growth
+        #COMMENT: of the previous iterations (at least twice the last one since the tree grows with the depth)
+        elapsed = time.perf_counter() - start
+        remaining = None if deadline is None else deadline.remaining()
+        if remaining is not None:
+            growth = 2 if not previous_time else max(2, elapsed / previous_time)
+            if elapsed * growth > remaining: break
+        depth, previous_time = depth + 1, elapsed
+    if stats is not None: stats.reached_horizon, stats.completed_depth = reached_horizon, completed_depth
+    return result
+
+# Apply Principal Variation Search (NegaScout) and return the tree value and the best action
+# The first action of each node (the best action stored in the transposition table, if any) is expected to be the best one.
+# So only the first action is searched with the full (alpha, beta) window, and the others are searched with a null window
+# which can only tell whether they are better than the best value so far. Only an action that turns out to be better is searched again.
+# Since the values are floats, the null window is between alpha (or beta) and the next float after (or before) it.
+# The re-searches are cheap since the table already contains the results of the null window search.
+# Hint: Read the hint for minimax.
+def principal_variation_search(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, table: Optional[TranspositionTable] = None) -> Tuple[float, A]:
+    return alphabeta_with_transposition_table(game, state, heuristic, max_depth, deadline, table, principal_variation=True)
+
+# The default half width of the aspiration windows (in heuristic units)
+ASPIRATION_WINDOW = 3
+
+# Apply Principal Variation Search with iterative deepening and aspiration windows and return the tree value and the best action
+# Each iteration starts with a narrow window around the value of the previous iteration, which prunes more than a full window.
+# If the value falls outside the window, the iteration is repeated with that side of the window opened to infinity.
+# Hint: Read the hint for minimax.
+def pvs_with_aspiration_windows(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, table: Optional[TranspositionTable] = None, window: float = ASPIRATION_WINDOW) -> Tuple[float, A]:
+    return iterative_deepening_alphabeta(game, state, heuristic, max_depth, deadline, table, principal_variation=True, window=window)
+
 
 # Apply Expectimax search and return the tree value and the best action
 # Hint: Read the hint for minimax, but note that the monsters (turn > 0) do not act as min nodes anymore,
 # they now act as chance nodes (they act randomly).
-def expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+def expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
     agent = game.get_turn(state)
     terminal, values = game.is_terminal(state)
     #COMMENT: In case of terminal state or max depth return the leaf value or heuristic value and None as action
     if terminal: return values[0], None
-    if max_depth == 0: return heuristic(game, state, 0), None
+    if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, state, 0), None
     #COMMENT: If the current agent is the max agent
     if agent == 0:
         optimal_value = -math.inf
         optimal_action = None
         for action in game.get_actions(state):
-            value, _ = expectimax(game, game.get_successor(state, action), heuristic, max_depth - 1)
+            value, _ = expectimax(game, game.get_successor(state, action), heuristic, max_depth - 1, deadline)
+            if deadline is not None and deadline.timed_out: break
             if value > optimal_value:
                 optimal_value = value
                 optimal_action = action
@@ -181,9 +412,239 @@ def expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_dep
         optimal_value = 0
         optimal_action = None
         #COMMENT: Because all actions are equally likely we can just calculate the average value
-        for action in game.get_actions(state):
-            value, _ = expectimax(game, game.get_successor(state, action), heuristic, max_depth - 1)
+        actions = game.get_actions(state)
+        for action in actions:
+            value, _ = expectimax(game, game.get_successor(state, action), heuristic, max_depth - 1, deadline)
+            if deadline is not None and deadline.timed_out: break
             optimal_value += value
-        optimal_value /= len(game.get_actions(state))
+        optimal_value /= len(actions)
+        return optimal_value, optimal_action
+
+# Apply Expectimax search with Star1 pruning and return the same tree value and best action as expectimax
+# Since the values are bounded (see "Game.get_value_bounds"), a chance node can be pruned as soon as the average of its children
+# is guaranteed to be below alpha, even if some children were not searched yet: the unsearched children are replaced by their upper bound
+# to get an upper bound on the average. The window of each child is also narrowed to the values that can still move the average above alpha.
+# If "probing" is True, the children of a chance node are probed with the heuristic before they are searched, and the children
+# with the lowest probe values are searched first, since a low child is the most likely to prove that the average is below alpha.
+# The probes cost a heuristic evaluation per child, so they only pay off if the heuristic is cheap compared to searching a child.
+# A pruned node returns an upper bound on its value instead of its exact value, but these values never change the decision
+# of their parent, so the root value is exactly the value returned by expectimax (the averages are also summed in the same order).
+# Hint: Read the hint for expectimax.
+def expectimax_with_pruning(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, probing: bool = False) -> Tuple[float, A]:
+    #COMMENT: The window only has a lower limit "alpha" since there are no min nodes to give it an upper limit
+    def expectimax_with_pruning_backtrack(state: S, max_depth: int, alpha: float) -> Tuple[float, A]:
+        agent = game.get_turn(state)
+        terminal, values = game.is_terminal(state)
+        if terminal: return values[0], None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, state, 0), None
+        actions = game.get_actions(state)
+        if agent == 0:
+            optimal_value = -math.inf
+            optimal_action = None
+            for action in actions:
+                value, _ = expectimax_with_pruning_backtrack(game.get_successor(state, action), max_depth - 1, max(alpha, optimal_value))
+                if deadline is not None and deadline.timed_out: break
+                if value > optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+            return optimal_value, optimal_action
+        #COMMENT: This is a chance node where all the actions are equally likely
+        count = len(actions)
+        children = [game.get_successor(state, action) for action in actions]
+        order = list(range(count))
+        if probing and alpha > -math.inf:
+            order.sort(key=lambda index: heuristic(game, children[index], 0))
+        _, upper = game.get_value_bounds(state)
+        values: List[float] = [0] * count
+        searched_total = 0
+        for position, index in enumerate(order):
+            rest_upper = upper * (count - position - 1) if position < count - 1 else 0
+            #COMMENT: The child value must be above this to keep the average above alpha
+            child_alpha = count * alpha - searched_total - rest_upper
+            value, _ = expectimax_with_pruning_backtrack(children[index], max_depth - 1, child_alpha)
+            if deadline is not None and deadline.timed_out: break
+            if value <= child_alpha:
+                #COMMENT: The average is at most alpha, so we prune the remaining children.
+                #COMMENT: The bound is computed again and the child is searched fully if rounding errors made the test wrong.
+                bound = (searched_total + value + rest_upper) / count
+                if bound <= alpha: return bound, None
+                value, _ = expectimax_with_pruning_backtrack(children[index], max_depth - 1, -math.inf)
+                if deadline is not None and deadline.timed_out: break
+            values[index] = value
+            searched_total += value
+        #COMMENT: The values are summed in the order of the actions to get exactly the same average as expectimax
+        total = 0
+        for value in values:
+            total += value
+        return total / count, None
+    return expectimax_with_pruning_backtrack(state, max_depth, -math.inf)
+
+# The default number of outcomes sampled at each chance node by sparse_expectimax
+SPARSE_SAMPLES = 3
+
+# The statistics of the sparse expectimax search (they describe the last search that received the object)
+@dataclass()
+class SparseStats:
+    error: float = 0 #COMMENT: An estimate of the standard error of the returned value
+
+# Apply Expectimax search with sparse sampling at the chance nodes and return the estimated tree value and the best action
+# Instead of averaging all the actions of a chance node, it averages a random sample of "samples" actions (without replacement),
+# so the size of the tree grows with the number of samples instead of the number of actions. If "samples" is None, it averages
+# all the actions (which is the same as expectimax). The values of the chance nodes are also memoised by their hash (see "Game.get_hash")
+# and remaining depth, so a chance node reached by different sequences of actions is only searched once.
+# The sampling is reproducible since it uses a random generator seeded by "seed".
+# If a "stats" object is given, its "error" holds an estimate of the standard error of the returned value after the search
+# (it is 0 when no chance node was sampled and infinite if a single outcome was sampled since the spread cannot be estimated).
+# It only accounts for the sampling noise, not for the optimistic bias of taking the maximum of noisy values at the max nodes.
+# Hint: Read the hint for expectimax.
+def sparse_expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None, samples: Optional[int] = SPARSE_SAMPLES, seed: int = 0, stats: Optional[SparseStats] = None) -> Tuple[float, A]:
+    assert samples is None or samples >= 1, "at least one outcome must be sampled at each chance node"
+    rng = RandomGenerator(seed)
+    memo: Dict[Tuple[Hashable, int], Tuple[float, float]] = {}
+    #COMMENT: Each call returns the value, the standard error of the value and the best action
+    def sparse_expectimax_backtrack(state: S, max_depth: int) -> Tuple[float, float, A]:
+        agent = game.get_turn(state)
+        terminal, values = game.is_terminal(state)
+        if terminal: return values[0], 0, None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, state, 0), 0, None
+        actions = game.get_actions(state)
+        if agent == 0:
+            optimal_value, optimal_error, optimal_action = -math.inf, 0, None
+            for action in actions:
+                value, error, _ = sparse_expectimax_backtrack(game.get_successor(state, action), max_depth - 1)
+                if deadline is not None and deadline.timed_out: break
+                if value > optimal_value:
+                    optimal_value, optimal_error, optimal_action = value, error, action
+            return optimal_value, optimal_error, optimal_action
+        #COMMENT: The values of the chance nodes are memoised (a negative depth means that there is no depth cutoff)
+        key = (game.get_hash(state), max(max_depth, -1))
+        memoised = memo.get(key)
+        if memoised is not None: return memoised[0], memoised[1], None
+        count = len(actions)
+        if samples is not None and samples < count:
+            #COMMENT: Pick the sample with a partial Fisher-Yates shuffle
+            actions = list(actions)
+            for index in range(samples):
+                other = rng.int(index, count - 1)
+                actions[index], actions[other] = actions[other], actions[index]
+            actions = actions[:samples]
+        results = [sparse_expectimax_backtrack(game.get_successor(state, action), max_depth - 1) for action in actions]
+        n = len(results)
+        value = sum(value for value, _, _ in results) / n
+        #COMMENT: The error combines the errors of the children and the sampling error of the mean.
+        #COMMENT: The sampling error uses the finite population correction since the sample is drawn without replacement.
+        variance = sum(error * error for _, error, _ in results) / (n * n)
+        if n < count and n > 1:
+            sample_variance = sum((child - value) ** 2 for child, _, _ in results) / (n - 1)
+            variance += sample_variance / n * (count - n) / (count - 1)
+        elif n < count:
+            #COMMENT: The spread cannot be estimated from a single sample, so the error is unknown
+            variance = math.inf
+        error = math.sqrt(variance)
+        memo[key] = (value, error)
+        return value, error, None
+    value, error, action = sparse_expectimax_backtrack(state, max_depth)
+    if stats is not None: stats.error = error
+    return value, action
+
+# The following searches are the same as minimax, alphabeta and expectimax but they do not create a successor for every node.
+# Instead, they create a single working state (using "game.make_working_state"), apply each action to it in place
+# before searching the child and undo the action when backtracking (see the "apply" and "undo" functions in game.py).
+# They return the same values and actions as the original searches and explore the nodes in the same order.
+
+# Apply Minimax search on a single working state and return the game tree value and the best action
+def minimax_in_place(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
+    #COMMENT: All the recursive calls share this working state
+    board = game.make_working_state(state)
+    def minimax_backtrack(max_depth: int) -> Tuple[float, A]:
+        agent = game.get_turn(board)
+        terminal, values = game.is_terminal(board)
+        if terminal: return values[0], None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, board, 0), None
+        optimal_value = -math.inf if agent == 0 else math.inf
+        optimal_action = None
+        #COMMENT: The actions are listed before applying any of them since the board changes during the loop
+        for action in game.get_actions(board):
+            token = game.apply(board, action)
+            value, _ = minimax_backtrack(max_depth - 1)
+            game.undo(board, token)
+            if deadline is not None and deadline.timed_out: break
+            #COMMENT: Update the optimal value and action (bigger for the max agent and smaller for the min agents)
+            if (value > optimal_value) if agent == 0 else (value < optimal_value):
+                optimal_value = value
+                optimal_action = action
         return optimal_value, optimal_action
+    return minimax_backtrack(max_depth)
+
+# Apply Alpha Beta pruning on a single working state and return the tree value and the best action
+def alphabeta_in_place(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
+    board = game.make_working_state(state)
+    def alphabeta_backtrack(max_depth: int, alpha: float, beta: float) -> Tuple[float, A]:
+        agent = game.get_turn(board)
+        terminal, values = game.is_terminal(board)
+        if terminal: return values[0], None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, board, 0), None
+        if agent == 0:
+            optimal_value = -math.inf
+            optimal_action = None
+            for action in game.get_actions(board):
+                token = game.apply(board, action)
+                value, _ = alphabeta_backtrack(max_depth - 1, alpha, beta)
+                #COMMENT: The board must be restored before returning (even when pruning)
+                game.undo(board, token)
+                if deadline is not None and deadline.timed_out: break
+                if value > optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+                alpha = max(alpha, optimal_value)
+                if optimal_value >= beta:
+                    return optimal_value, optimal_action
+            return optimal_value, optimal_action
+        else:
+            optimal_value = math.inf
+            optimal_action = None
+            for action in game.get_actions(board):
+                token = game.apply(board, action)
+                value, _ = alphabeta_backtrack(max_depth - 1, alpha, beta)
+                game.undo(board, token)
+                if deadline is not None and deadline.timed_out: break
+                if value < optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+                beta = min(beta, optimal_value)
+                if optimal_value <= alpha:
+                    return optimal_value, optimal_action
+            return optimal_value, optimal_action
+    return alphabeta_backtrack(max_depth, -math.inf, math.inf)
 
+# Apply Expectimax search on a single working state and return the tree value and the best action
+def expectimax_in_place(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, deadline: Optional[Deadline] = None) -> Tuple[float, A]:
+    board = game.make_working_state(state)
+    def expectimax_backtrack(max_depth: int) -> Tuple[float, A]:
+        agent = game.get_turn(board)
+        terminal, values = game.is_terminal(board)
+        if terminal: return values[0], None
+        if max_depth == 0 or (deadline is not None and deadline.tick()): return heuristic(game, board, 0), None
+        actions = game.get_actions(board)
+        if agent == 0:
+            optimal_value = -math.inf
+            optimal_action = None
+            for action in actions:
+                token = game.apply(board, action)
+                value, _ = expectimax_backtrack(max_depth - 1)
+                game.undo(board, token)
+                if deadline is not None and deadline.timed_out: break
+                if value > optimal_value:
+                    optimal_value = value
+                    optimal_action = action
+            return optimal_value, optimal_action
+        #COMMENT: A chance node returns the average value of its children (assuming a uniform distribution)
+        total = 0
+        for action in actions:
+            token = game.apply(board, action)
+            value, _ = expectimax_backtrack(max_depth - 1)
+            game.undo(board, token)
+            if deadline is not None and deadline.timed_out: break
+            total += value
+        return total / len(actions), None
+    return expectimax_backtrack(max_depth)
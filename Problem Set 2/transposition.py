@@ -0,0 +1,90 @@
+from typing import Any, Hashable, List, NamedTuple, Optional
+
+# This file contains a fixed-size transposition table for the game-tree searches
+# The same state can be reached by different sequences of actions (e.g. when the monsters move in a different order),
+# so the table stores the result of searching each state and the search can reuse it instead of searching the state again.
+# Each entry stores the depth of the search below the state, the value and whether the value is exact or only a bound
+# (alpha-beta returns a lower bound when it prunes at a max node and an upper bound when no action reached alpha).
+# The table has a fixed number of slots and each state is stored in the slot selected by its hash.
+# When two states compete for a slot, the replacement policy keeps the entry of the deeper search
+# unless the stored entry comes from an older search (see "new_search"), since the old entries are less likely to be needed again.
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# The depth stored for a search without a depth cutoff (deeper than any limited search)
+UNLIMITED_DEPTH = 1 << 30
+
+class TranspositionEntry(NamedTuple):
+    key: Hashable       # The full key of the state (to detect two states sharing the same slot)
+    depth: int          # The remaining depth of the search that computed the value
+    bound: int          # EXACT, LOWER or UPPER
+    value: float
+    move: Any           # The best action found in the state (or None)
+    generation: int     # The search in which the entry was stored
+
+class TranspositionTable:
+    slots: List[Optional[TranspositionEntry]]
+    mask: int
+    generation: int
+    # Statistics
+    probes: int         # The number of lookups
+    hits: int           # The number of lookups that found the state
+    cutoffs: int        # The number of hits whose value was used without searching the state
+    stores: int         # The number of stored entries
+    replacements: int   # The number of stored entries that overwrote an entry of another state
+    rejections: int     # The number of entries that were not stored due to the replacement policy
+
+    # The size is rounded up to a power of two so the slot is selected with a mask
+    def __init__(self, size: int = 1 << 16) -> None:
+        assert size >= 1, "the table must have at least one slot"
+        size = 1 << (size - 1).bit_length()
+        self.slots = [None] * size
+        self.mask = size - 1
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = self.hits = self.cutoffs = 0
+        self.stores = self.replacements = self.rejections = 0
+
+    # Marks the start of a new search, so the entries of the previous searches can be replaced by shallower ones
+    def new_search(self):
+        self.generation += 1
+
+    # Returns the entry of the state with the given key (or None if it is not in the table)
+    def lookup(self, key: Hashable) -> Optional[TranspositionEntry]:
+        self.probes += 1
+        entry = self.slots[hash(key) & self.mask]
+        if entry is None or entry.key != key:
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key: Hashable, depth: int, bound: int, value: float, move: Any):
+        index = hash(key) & self.mask
+        entry = self.slots[index]
+        if entry is not None and entry.key != key and entry.generation == self.generation and entry.depth > depth:
+            self.rejections += 1
+            return
+        if entry is not None and entry.key != key:
+            self.replacements += 1
+        self.stores += 1
+        self.slots[index] = TranspositionEntry(key, depth, bound, value, move, self.generation)
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.generation = 0
+        self.reset_stats()
+
+    # The number of occupied slots
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self.slots)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0
+
+    # Returns a human readable summary of the statistics
+    def report(self) -> str:
+        return f"Transposition table: {self.probes} probes, {self.hits} hits ({100 * self.hit_rate:.1f}%), {self.cutoffs} cutoffs, " \
+            f"{self.stores} stores, {self.replacements} replacements, {self.rejections} rejections, {len(self)}/{len(self.slots)} slots used"
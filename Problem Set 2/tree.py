@@ -63,6 +63,30 @@ class TreeNode:
         root = convert(problem_def, 'root')
         return root
 
+# This is a working state for the in-place searches on a game tree
+# It points to a node and exposes the same fields, so the game functions and the heuristic can read it like a node
+# Note that "TreeGame.is_terminal" records its arguments, so the recorded cursor always shows the node it points to now.
+class TreeCursor:
+    node: TreeNode
+
+    def __init__(self, node: TreeNode) -> None:
+        self.node = node
+
+    @property
+    def name(self) -> str:
+        return self.node.name
+
+    @property
+    def children(self) -> Optional[Dict[str, TreeNode]]:
+        return self.node.children
+
+    @property
+    def value(self) -> float:
+        return self.node.value
+
+    def __str__(self) -> str:
+        return str(self.node)
+
 # This is the implementation of a game played on a game tree
 class TreeGame(Game[List, str]):
     
@@ -105,6 +129,36 @@ class TreeGame(Game[List, str]):
     # Given a state and an action, this function returns the next state 
     def get_successor(self, state: TreeNode, action: str) -> TreeNode:
         return state.children[action]
+
+    # The node names are unique paths from the root, so they identify the states
+    def get_hash(self, state: TreeNode) -> str:
+        return state.name
+
+    # The values (and the heuristic values) of a node are between the smallest and the largest leaf values below it
+    # The bounds of each node are computed once and cached by the node name
+    def get_value_bounds(self, state: TreeNode) -> Tuple[float, float]:
+        cache = self.cache()
+        bounds = cache.get(state.name)
+        if bounds is None:
+            if state.children is None:
+                bounds = (state.value, state.value)
+            else:
+                children = [self.get_value_bounds(child) for child in state.children.values()]
+                bounds = (min(lower for lower, _ in children), max(upper for _, upper in children))
+            cache[state.name] = bounds
+        return bounds
+
+    # Moving the cursor to a child only needs the parent to undo it
+    def make_working_state(self, state: TreeNode) -> TreeCursor:
+        return TreeCursor(state)
+
+    def apply(self, state: TreeCursor, action: str) -> TreeNode:
+        parent = state.node
+        state.node = parent.children[action]
+        return parent
+
+    def undo(self, state: TreeCursor, token: TreeNode):
+        state.node = token
     
     # create a tree game from a path to a tree file
     @staticmethod